@@ -0,0 +1,7 @@
+"""Offline benchmarks for the agent and the ingestion pipeline.
+
+Runs against local stand-ins for OpenAI, DuckDuckGo, Nominatim, the scraped
+sites and Neo4j, so no network or database is needed:
+
+    python -m bench --restaurants 200 --questions 50 --output bench_results.json
+"""
@@ -0,0 +1,248 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+# Settings are read on import of core, point them at throwaway local state first
+_workdir = tempfile.mkdtemp(prefix="tripwise-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_workdir}/bench.db")
+os.environ.setdefault("SEARCH_CACHE_MODE", "off")
+os.environ.setdefault("DATASET_ENABLED", "false")
+
+import httpx  # noqa: E402
+
+from core import clients  # noqa: E402
+from core.config import settings  # noqa: E402
+
+from .fakes import FakeAsyncOpenAI, FakeChatModel, FakeDDGS, menu_items, web_transport  # noqa: E402
+from .graph import AsyncDriver, Driver, GraphStore, InMemoryGraph  # noqa: E402
+
+CITY = "Warszawa"
+UNKNOWN_CITY = "Kraków"
+
+QUESTIONS = [
+    "Where can I eat pierogi in Warszawa?",
+    "What is a good restaurant for dinner in Warszawa?",
+    "Recommend a place with polish food in Warszawa",
+    "Where to eat tatar in Warszawa?",
+    "What restaurant in Kraków serves soup?",
+    "Jaka jest pogoda w Warszawie?",
+    "Restaurants close to the Old Town in Warszawa",
+    "Reviews mentioning zimna zupa in Warszawa",
+]
+
+
+def percentiles(samples: list[float]) -> dict:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+
+    def _at(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    return {
+        "count": len(ordered),
+        "mean": sum(ordered) / len(ordered),
+        "p50": _at(0.50),
+        "p95": _at(0.95),
+        "p99": _at(0.99),
+        "max": ordered[-1],
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def install_fakes(args, graph: InMemoryGraph) -> FakeAsyncOpenAI:
+    openai = FakeAsyncOpenAI(latency=args.llm_latency)
+    chat_model = FakeChatModel(
+        latency=args.llm_latency,
+        token_latency=args.token_latency,
+        cities=[CITY, UNKNOWN_CITY],
+        structured={
+            "InputCheck": lambda prompt: {"valid": "pogoda" not in prompt},
+            "BooleanAnswer": lambda prompt: {"result": False},
+            "CityExtraction": lambda prompt: {"city": UNKNOWN_CITY if "Krak" in prompt else CITY},
+        },
+    )
+    clients.install(
+        neo4j_driver=Driver(graph),
+        async_neo4j_driver=AsyncDriver(graph),
+        neo4j_graph=GraphStore(graph),
+        chat_model=chat_model,
+        async_openai_client=openai,
+        async_http_client=httpx.AsyncClient(
+            transport=web_transport({CITY: args.restaurants}, latency=args.http_latency),
+            follow_redirects=True,
+        ),
+    )
+
+    from core import search_reviews, search_web
+
+    FakeDDGS.latency = args.search_latency
+    search_web.DDGS = FakeDDGS
+    search_reviews.DDGS = FakeDDGS
+    return openai
+
+
+async def bench_inserts(args, graph: InMemoryGraph) -> dict:
+    from core import search_web
+    from core.write_buffer import write_buffer
+
+    payload = json.dumps(menu_items(), ensure_ascii=False)
+    rows_per_call = len(menu_items())
+    names = [f"Insert bench {i}" for i in range(args.restaurants)]
+
+    started = time.perf_counter()
+    for name in names:
+        await asyncio.to_thread(search_web.insert_from_json, name, payload, city=CITY)
+    direct = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await asyncio.gather(*(search_web.ainsert_from_json(name, payload, city=CITY) for name in names))
+    await write_buffer.flush()
+    buffered = time.perf_counter() - started
+
+    rows = rows_per_call * len(names)
+    return {
+        "restaurants": len(names),
+        "rows": rows,
+        "insert_from_json": {"seconds": direct, "rows_per_second": rows / direct},
+        "write_buffer": {"seconds": buffered, "rows_per_second": rows / buffered, **write_buffer.stats()},
+    }
+
+
+async def bench_download(args, graph: InMemoryGraph, openai: FakeAsyncOpenAI) -> dict:
+    from core.fetcher import fetch_stats
+    from core.ingest_restaurants_api import download_to_db
+    from core.url_ranking import url_ranker
+
+    llm_calls = openai.responses.calls
+    started = time.perf_counter()
+    await download_to_db(CITY, force=True)
+    elapsed = time.perf_counter() - started
+
+    return {
+        "restaurants": args.restaurants,
+        "seconds": elapsed,
+        "restaurants_per_second": args.restaurants / elapsed,
+        "llm_calls": openai.responses.calls - llm_calls,
+        "fetcher": fetch_stats.stats(),
+        "url_ranking": url_ranker.stats(),
+        "graph": graph.stats(),
+    }
+
+
+async def bench_call_graph(args) -> dict:
+    from core.agent import stream_graph
+    from core.intent_router import intent_router
+
+    nodes = defaultdict(list)
+    totals = []
+    first_token = []
+    for i in range(args.questions):
+        # Unique questions and sessions, the answer cache would hide the graph otherwise
+        question = f"{QUESTIONS[i % len(QUESTIONS)]} #{i}"
+        started = time.perf_counter()
+        node_started = {}
+        token_seen = False
+        async for event in stream_graph(question, f"bench-{i}"):
+            now = time.perf_counter()
+            if event["event"] == "node":
+                node = event["data"]["node"]
+                if event["data"]["status"] == "start":
+                    node_started[node] = now
+                elif node in node_started:
+                    nodes[node].append(now - node_started.pop(node))
+            elif event["event"] == "token" and not token_seen:
+                token_seen = True
+                first_token.append(now - started)
+        totals.append(time.perf_counter() - started)
+
+    return {
+        "questions": args.questions,
+        "total": percentiles(totals),
+        "first_token": percentiles(first_token),
+        "nodes": {node: percentiles(samples) for node, samples in nodes.items()},
+        "intent_router": intent_router.stats(),
+    }
+
+
+async def run(args) -> dict:
+    from core import database
+    from core.write_buffer import write_buffer
+
+    graph = InMemoryGraph(latency=args.db_latency)
+    openai = install_fakes(args, graph)
+
+    async with database.engine.begin() as conn:
+        # Imported for their models
+        from core import agent, checkpointer, jobs, search_cache  # noqa: F401
+        await conn.run_sync(database.Base.metadata.create_all)
+
+    results = {
+        "inserts": await bench_inserts(args, graph),
+        "download_to_db": await bench_download(args, graph, openai),
+        "call_graph": await bench_call_graph(args),
+    }
+    await write_buffer.close()
+    await clients.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline TripWise benchmarks")
+    parser.add_argument("--restaurants", type=int, default=100, help="restaurants returned for the city")
+    parser.add_argument("--questions", type=int, default=30, help="questions sent through the agent")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per LLM call")
+    parser.add_argument("--token-latency", type=float, default=0.002, help="seconds per streamed token")
+    parser.add_argument("--search-latency", type=float, default=0.05, help="seconds per web search")
+    parser.add_argument("--http-latency", type=float, default=0.02, help="seconds per page fetch")
+    parser.add_argument("--db-latency", type=float, default=0.001, help="seconds per Neo4j round trip")
+    parser.add_argument("--output", default="-", help="file for the JSON results, - for stdout")
+    parser.add_argument("--verbose", action="store_true", help="keep the app's own logging")
+    args = parser.parse_args()
+
+    log = io.StringIO()
+    with contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(log):
+        results = asyncio.run(run(args))
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "parameters": vars(args),
+        "settings": {
+            "ENRICH_CONCURRENCY": settings.ENRICH_CONCURRENCY,
+            "PROBE_TOP_K": settings.PROBE_TOP_K,
+            "WRITE_BATCH_SIZE": settings.WRITE_BATCH_SIZE,
+            "URL_RANKING_MODE": settings.URL_RANKING_MODE,
+            "SEARCH_CACHE_MODE": settings.SEARCH_CACHE_MODE,
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2, default=str)
+    if args.output == "-":
+        print(output)
+    else:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        print(f"Results written to {args.output}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Deterministic stand-ins for the chat model, OpenAI, DuckDuckGo and the web.
+
+Every fake sleeps for a configurable latency instead of doing real work, so
+the benchmarks measure the app's own overhead and concurrency rather than
+the network. Pages are served from the recorded fixtures next to this file.
+"""
+
+import asyncio
+import csv
+import json
+import re
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import httpx
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+from core.text_utils import normalize
+
+FIXTURES = Path(__file__).parent / "fixtures"
+MENU_CSV = Path(__file__).parent.parent / "buff.csv"
+
+ANSWER = (
+    "Based on the restaurants I know, you could try {name}. Their menu has {dishes}. "
+    "It is a good pick for a relaxed dinner, book a table in the evening."
+)
+
+REVIEWS = [
+    {"review": "Świetne pierogi i bardzo miła obsługa, polecam!", "score": 5},
+    {"review": "Dobre jedzenie, ale długo czekaliśmy na danie główne.", "score": 3.5},
+    {"review": "Rosół jak u babci. Ceny trochę wysokie.", "score": 4},
+    {"review": "Nie polecam, zimna zupa i niemiła kelnerka.", "score": 1.5},
+    {"review": "Najlepszy tatar w mieście, wrócimy na pewno.", "score": 5},
+    {"review": "Przyzwoite miejsce na lunch w centrum.", "score": 3.5},
+]
+
+
+def slug(text: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", normalize(text)).strip("-")
+
+
+def menu_items() -> list[dict]:
+    items = []
+    with open(MENU_CSV, encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            try:
+                price = float(row["Price"].replace(",", "."))
+            except ValueError:
+                price = None
+            items.append({"dish": " ".join(row["Dish"].split()), "price": price})
+    return items
+
+
+def _prompt_text(messages) -> str:
+    return "\n".join(str(message.content) for message in messages)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model answering the agent's prompts: Cypher for the QA chain, a canned answer
+    (streamed token by token) and structured outputs from the structured mapping.
+    """
+    latency: float = 0.0
+    token_latency: float = 0.0
+    cities: list[str] = []
+    # Schema class name -> function of the prompt returning the field values
+    structured: dict[str, Any] = {}
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat-model"
+
+    def _city(self, text: str) -> str | None:
+        wanted = normalize(text)
+        return next((city for city in self.cities if normalize(city) in wanted), None)
+
+    def _reply(self, text: str) -> str:
+        if "Generate Cypher statement" in text:
+            city = self._city(text.split("The question is:")[-1]) or "Atlantis"
+            return (
+                "MATCH (r:Restaurant)<-[:servedIn]-(m:Menu) "
+                f"WHERE r.city = '{city}' RETURN r.name AS name, collect(m.name) AS dishes LIMIT 10"
+            )
+        names = re.findall(r"'(?:name|restaurant)': '([^']+)'", text)
+        dishes = re.findall(r"'(?:dishes|matching_dishes)': \['([^']+)'|'dish': '([^']+)'", text)
+        dishes = [a or b for a, b in dishes]
+        return ANSWER.format(name=names[0] if names else "a local bistro", dishes=dishes[0] if dishes else "pierogi")
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(_prompt_text(messages))))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._reply(_prompt_text(messages))))])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        for token in re.findall(r"\S+\s*", self._reply(_prompt_text(messages))):
+            await asyncio.sleep(self.token_latency)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    def with_structured_output(self, schema, **kwargs):
+        respond: Callable[[str], dict] = self.structured[schema.__name__]
+
+        async def _ainvoke(prompt):
+            await asyncio.sleep(self.latency)
+            return schema(**respond(str(prompt)))
+
+        def _invoke(prompt):
+            time.sleep(self.latency)
+            return schema(**respond(str(prompt)))
+
+        return RunnableLambda(_invoke, afunc=_ainvoke)
+
+
+class _Usage:
+    def __init__(self, input_tokens: int, output_tokens: int):
+        self.input_tokens = input_tokens
+        self.output_tokens = output_tokens
+
+
+class _Response:
+    def __init__(self, output_text: str, input_text: str = ""):
+        self.output_text = output_text
+        # Same rough chars per token as html_reduce
+        self.usage = _Usage(len(input_text) // 4, len(output_text) // 4)
+
+
+class _Responses:
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self.menu = json.dumps(menu_items(), ensure_ascii=False)
+        self.reviews = json.dumps(REVIEWS, ensure_ascii=False)
+
+    async def create(self, model: str, instructions: str, input: str, text: dict | None = None, **kwargs):
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        if text and text.get("format", {}).get("name") == "rankings":
+            batch = json.loads(input)
+            return _Response(json.dumps({"rankings": [
+                {"key": entry["key"], "ids": [result["id"] for result in entry["results"]]} for entry in batch
+            ]}), input)
+        if "menu" in instructions and "json" in instructions:
+            return _Response(self.menu, input)
+        if "rewiews" in instructions and "json" in instructions:
+            return _Response(self.reviews, input)
+        return _Response("0,1,2,3", input)
+
+
+class FakeAsyncOpenAI:
+    def __init__(self, latency: float = 0.0):
+        self.responses = _Responses(latency)
+
+    async def close(self):
+        pass
+
+
+class FakeDDGS:
+    """
+    DDGS replacement: an official site with a menu, a review portal, an unrelated page and a dead link.
+    """
+    latency = 0.0
+
+    def text(self, query: str, max_results: int = 10) -> list[dict]:
+        time.sleep(self.latency)
+        name = slug(query)
+        return [
+            {"title": "Przewodnik po mieście", "href": "https://przewodnik.example/miasto",
+             "body": "Zabytki, muzea i parki w mieście."},
+            {"title": f"{query} - opinie", "href": f"https://www.tripadvisor.pl/Restaurant_Review-{name}",
+             "body": "Ocena 4.2/5, 6 opinii gości."},
+            {"title": f"{query} - karta dań", "href": f"https://{name}.example/menu",
+             "body": "Menu restauracji, pierogi 59 zł, rosół 29 zł."},
+            {"title": query, "href": f"https://dead.example/{name}", "body": ""},
+        ][:max_results]
+
+
+def web_transport(cities: dict[str, int], latency: float = 0.0) -> httpx.MockTransport:
+    """
+    Serve Nominatim answers for the cities (name -> number of restaurants) and the recorded pages.
+    """
+    pages = {
+        "menu": (FIXTURES / "menu.html").read_bytes(),
+        "reviews": (FIXTURES / "reviews.html").read_bytes(),
+        "guide": (FIXTURES / "city_guide.html").read_bytes(),
+    }
+    html_headers = {"content-type": "text/html; charset=utf-8"}
+    # Pages are served as streams (content= would be read up front), so the fetcher counts and caps the bytes
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(latency)
+        host = request.url.host
+        if host == "nominatim.openstreetmap.org":
+            wanted = normalize(request.url.params.get("q", ""))
+            city = next((c for c in cities if normalize(c) in wanted), None)
+            places = [
+                {
+                    "name": f"Restauracja {i} {city}",
+                    "address": {"city": city, "country": "Polska"},
+                    "place_rank": 30,
+                    # Strings, like jsonv2 sends them, spread ~100 m apart around the old town
+                    "lat": f"{52.2297 + (i % 10) * 0.001:.6f}",
+                    "lon": f"{21.0122 + (i // 10) * 0.0015:.6f}",
+                }
+                for i in range(cities.get(city, 0))
+            ]
+            return httpx.Response(200, json=places)
+        if host == "dead.example":
+            raise httpx.ConnectError("Connection refused", request=request)
+        if host.endswith("tripadvisor.pl"):
+            return httpx.Response(200, stream=httpx.ByteStream(pages["reviews"]), headers=html_headers)
+        if request.url.path == "/menu":
+            return httpx.Response(200, stream=httpx.ByteStream(pages["menu"]), headers=html_headers)
+        return httpx.Response(200, stream=httpx.ByteStream(pages["guide"]), headers=html_headers)
+
+    return httpx.MockTransport(handler)
@@ -0,0 +1,394 @@
+"""Containerless stand-in for Neo4j.
+
+InMemoryGraph keeps restaurants, menus, reviews and city coverage in dicts
+and answers the queries the app itself issues, recognised by a marker in
+the query text. Every round trip sleeps for a configurable latency so the
+benchmarks still see the cost of talking to the database. The driver,
+session and LangChain graph store wrappers mirror the small part of the
+neo4j / langchain_neo4j APIs the app uses.
+"""
+
+import asyncio
+import math
+import threading
+import time
+from collections import Counter
+
+from langchain_neo4j.graphs.graph_store import GraphStore as LangChainGraphStore
+
+from core.text_utils import normalize
+
+
+def haversine(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Meters between two WGS-84 points, what point.distance() returns.
+    """
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * 6_371_000 * math.asin(math.sqrt(a))
+
+
+class Record(dict):
+    def data(self) -> dict:
+        return dict(self)
+
+
+class InMemoryGraph:
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self._lock = threading.Lock()
+        self.restaurants: dict[tuple[str, str], dict] = {}
+        self.menus: dict[str, dict] = {}
+        self.served_in: set[tuple[str, tuple[str, str]]] = set()
+        self.reviews: dict[str, dict] = {}
+        self.about: set[tuple[str, tuple[str, str]]] = set()
+        self.cities: dict[str, dict] = {}
+        self.queries: Counter = Counter()
+        self.rows_written: Counter = Counter()
+        self.unhandled = 0
+        # Checked in order, the menu / review inserts also MERGE their Restaurant
+        self._handlers = [
+            ("MERGE (m:Menu", "menu_insert", self._merge_menus),
+            ("MERGE (m:Reviews", "review_insert", self._merge_reviews),
+            ("MERGE (c:City", "record_coverage", self._record_coverage),
+            ("MATCH (c:City", "city_coverage", self._city_coverage),
+            ("r.menu_updated_at AS menu", "stale_enrichment", self._stale_enrichment),
+            ("MERGE (r:Restaurant", "restaurant_insert", self._merge_restaurants),
+            # intent_router templates, told apart by their RETURN clauses
+            ("RETURN DISTINCT r.city AS city", "known_cities", self._known_cities),
+            ("AS matching_dishes", "cuisine_in_city", self._cuisine_in_city),
+            ("AS average_price", "cheapest_in_city", self._cheapest_in_city),
+            ("AS rating, reviews", "best_rated_in_city", self._best_rated_in_city),
+            ("menu_name_fulltext", "dish_search", self._dish_search),
+            ("reviews_name_fulltext", "review_search", self._review_search),
+            ("AS distance_m", "nearby", self._nearby),
+            ("MATCH (r:Restaurant", "restaurant_match", self._match_restaurants),
+        ]
+
+    def execute(self, query: str, params: dict) -> list[Record]:
+        for marker, name, handler in self._handlers:
+            if marker in query:
+                self.queries[name] += 1
+                with self._lock:
+                    return [Record(row) for row in handler(query, params)]
+        self.unhandled += 1
+        return []
+
+    def _merge_restaurants(self, query, params):
+        for row in params["rows"]:
+            node = self.restaurants.setdefault((row["name"], row["city"]), {"name": row["name"], "city": row["city"]})
+            node.update({k: v for k, v in row.items() if k not in ("name", "city")})
+        self.rows_written["restaurant"] += len(params["rows"])
+        return []
+
+    def _restaurant(self, row, params):
+        key = (row.get("rest_name", params.get("rest_name")), row.get("city", params.get("city")))
+        return key, self.restaurants.setdefault(key, {"name": key[0], "city": key[1]})
+
+    def _merge_menus(self, query, params):
+        for row in params["rows"]:
+            key, restaurant = self._restaurant(row, params)
+            menu = self.menus.setdefault(row["dish"], {"name": row["dish"]})
+            if row.get("price") is not None:
+                menu["price"] = row["price"]
+            restaurant["menu_updated_at"] = params["now"]
+            self.served_in.add((row["dish"], key))
+        self.rows_written["menu"] += len(params["rows"])
+        return []
+
+    def _merge_reviews(self, query, params):
+        for row in params["rows"]:
+            key, restaurant = self._restaurant(row, params)
+            review = self.reviews.setdefault(row["hash"], {"hash": row["hash"]})
+            review["name"] = row["review"]
+            if row.get("score") is not None:
+                review["score"] = row["score"]
+            restaurant["reviews_updated_at"] = params["now"]
+            self.about.add((row["hash"], key))
+        self.rows_written["review"] += len(params["rows"])
+        return []
+
+    def _record_coverage(self, query, params):
+        found = [self.restaurants.get((row["name"], row["city"])) for row in params["rows"]]
+        found = [r for r in found if r is not None]
+        self.cities[params["key"]] = {
+            "key": params["key"],
+            "name": params["name"],
+            "ingested_at": params["now"],
+            "restaurant_count": len(found),
+            "menu_count": sum("menu_updated_at" in r for r in found),
+            "review_count": sum("reviews_updated_at" in r for r in found),
+        }
+        return []
+
+    def _city_coverage(self, query, params):
+        city = self.cities.get(params["key"])
+        if city is None:
+            return []
+        return [{k: city[k] for k in ("name", "ingested_at", "restaurant_count", "menu_count", "review_count")}]
+
+    def _stale_enrichment(self, query, params):
+        rows = []
+        for row in params["rows"]:
+            restaurant = self.restaurants.get((row["name"], row["city"]))
+            if restaurant is not None:
+                rows.append({
+                    "name": restaurant["name"],
+                    "city": restaurant["city"],
+                    "menu": restaurant.get("menu_updated_at"),
+                    "reviews": restaurant.get("reviews_updated_at"),
+                })
+        return rows
+
+    def _known_cities(self, query, params):
+        return [{"city": city} for city in {city for _, city in self.restaurants if city}]
+
+    def _dishes(self, key) -> list[dict]:
+        return [self.menus[dish] for dish, served in self.served_in if served == key]
+
+    def _cuisine_in_city(self, query, params):
+        rows = []
+        for key, restaurant in self.restaurants.items():
+            if key[1] != params["city"]:
+                continue
+            matching = [d["name"] for d in self._dishes(key) if any(k in d["name"].lower() for k in params["keywords"])]
+            if matching or any(k in key[0].lower() for k in params["keywords"]):
+                rows.append({"restaurant": key[0], "city": key[1], "matching_dishes": sorted(matching)[:5]})
+        rows.sort(key=lambda row: -len(row["matching_dishes"]))
+        return rows[:params["limit"]]
+
+    def _cheapest_in_city(self, query, params):
+        rows = []
+        for key in self.restaurants:
+            prices = [d["price"] for d in self._dishes(key) if d.get("price") is not None]
+            if key[1] == params["city"] and prices:
+                rows.append({"restaurant": key[0], "city": key[1], "average_price": round(sum(prices) / len(prices), 2),
+                             "cheapest_dish": min(prices), "priced_dishes": len(prices)})
+        rows.sort(key=lambda row: row["average_price"])
+        return rows[:params["limit"]]
+
+    def _best_rated_in_city(self, query, params):
+        rows = []
+        for key in self.restaurants:
+            scores = [self.reviews[h]["score"] for h, about in self.about if about == key and "score" in self.reviews[h]]
+            if key[1] == params["city"] and scores:
+                rows.append({"restaurant": key[0], "city": key[1], "rating": round(sum(scores) / len(scores), 2),
+                             "reviews": len(scores)})
+        rows.sort(key=lambda row: (-row["rating"], -row["reviews"]))
+        return rows[:params["limit"]]
+
+    @staticmethod
+    def _relevance(text: str, search: str) -> float:
+        # Rough stand-in for Lucene scoring of prefix terms over a standard-folding index
+        terms = [term.strip("*").replace("\\", "") for term in search.replace(" AND ", " ").split()]
+        words = normalize(text).split()
+        hits = sum(any(word.startswith(term) for word in words) for term in terms)
+        if " AND " in search and hits < len(terms):
+            return 0.0
+        return hits / len(terms) if terms else 0.0
+
+    def _dish_search(self, query, params):
+        rows = []
+        for dish, key in self.served_in:
+            relevance = self._relevance(dish, params["search"])
+            if relevance and params["city"] in (None, key[1]):
+                rows.append({"dish": dish, "price": self.menus[dish].get("price"), "restaurant": key[0],
+                             "city": key[1], "relevance": relevance})
+        rows.sort(key=lambda row: -row["relevance"])
+        return rows[:params["limit"]]
+
+    def _review_search(self, query, params):
+        rows = []
+        for review_hash, key in self.about:
+            review = self.reviews[review_hash]
+            relevance = self._relevance(review["name"], params["search"])
+            if relevance and params["city"] in (None, key[1]):
+                rows.append({"review": review["name"], "rating": review.get("score"), "restaurant": key[0],
+                             "city": key[1], "relevance": relevance})
+        rows.sort(key=lambda row: -row["relevance"])
+        return rows[:params["limit"]]
+
+    def _nearby(self, query, params):
+        rows = []
+        for (name, city), restaurant in self.restaurants.items():
+            if restaurant.get("lat") is None:
+                continue
+            distance = haversine(params["lat"], params["lon"], restaurant["lat"], restaurant["lon"])
+            if distance < params["radius"]:
+                rows.append({"restaurant": name, "city": city, "distance_m": round(distance)})
+        rows.sort(key=lambda row: row["distance_m"])
+        return rows[:params["limit"]]
+
+    def _match_restaurants(self, query, params):
+        # Stands in for whatever Cypher the LLM wrote: restaurants of the cities the query names
+        wanted = normalize(query)
+        rows = []
+        for (name, city), restaurant in self.restaurants.items():
+            if city and normalize(city) not in wanted:
+                continue
+            dishes = [dish for dish, key in self.served_in if key == (name, city)]
+            rows.append({"name": name, "city": city, "dishes": sorted(dishes)[:5]})
+            if len(rows) == 10:
+                break
+        return rows
+
+    def stats(self) -> dict:
+        return {
+            "queries": dict(self.queries),
+            "rows_written": dict(self.rows_written),
+            "unhandled": self.unhandled,
+            "restaurants": len(self.restaurants),
+            "menus": len(self.menus),
+            "reviews": len(self.reviews),
+        }
+
+
+class Result:
+    def __init__(self, records: list[Record]):
+        self._records = records
+
+    def __iter__(self):
+        return iter(self._records)
+
+    def single(self):
+        return self._records[0] if self._records else None
+
+    def data(self) -> list[dict]:
+        return [record.data() for record in self._records]
+
+    def consume(self):
+        return None
+
+
+class AsyncResult(Result):
+    def __aiter__(self):
+        return self._aiter()
+
+    async def _aiter(self):
+        for record in self._records:
+            yield record
+
+    async def single(self):
+        return super().single()
+
+    async def data(self) -> list[dict]:
+        return super().data()
+
+    async def consume(self):
+        return None
+
+
+class Session:
+    def __init__(self, graph: InMemoryGraph):
+        self.graph = graph
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query: str, parameters: dict | None = None, **kwargs) -> Result:
+        time.sleep(self.graph.latency)
+        return Result(self.graph.execute(query, {**(parameters or {}), **kwargs}))
+
+    def execute_write(self, work, *args, **kwargs):
+        return work(self, *args, **kwargs)
+
+    execute_read = execute_write
+
+    def close(self):
+        pass
+
+
+class AsyncSession:
+    def __init__(self, graph: InMemoryGraph):
+        self.graph = graph
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def run(self, query: str, parameters: dict | None = None, **kwargs) -> AsyncResult:
+        await asyncio.sleep(self.graph.latency)
+        return AsyncResult(self.graph.execute(query, {**(parameters or {}), **kwargs}))
+
+    async def execute_write(self, work, *args, **kwargs):
+        return await work(self, *args, **kwargs)
+
+    execute_read = execute_write
+
+    async def close(self):
+        pass
+
+
+class Driver:
+    def __init__(self, graph: InMemoryGraph):
+        self.graph = graph
+
+    def session(self, **kwargs) -> Session:
+        return Session(self.graph)
+
+    def verify_connectivity(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class AsyncDriver:
+    def __init__(self, graph: InMemoryGraph):
+        self.graph = graph
+
+    def session(self, **kwargs) -> AsyncSession:
+        return AsyncSession(self.graph)
+
+    async def verify_connectivity(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+STRUCTURED_SCHEMA = {
+    "node_props": {
+        "Restaurant": [
+            {"property": "name", "type": "STRING"},
+            {"property": "city", "type": "STRING"},
+            {"property": "country", "type": "STRING"},
+            {"property": "place_rank", "type": "INTEGER"},
+        ],
+        "Menu": [{"property": "name", "type": "STRING"}, {"property": "price", "type": "FLOAT"}],
+        "Reviews": [{"property": "name", "type": "STRING"}, {"property": "score", "type": "FLOAT"}],
+    },
+    "rel_props": {},
+    "relationships": [
+        {"start": "Menu", "type": "servedIn", "end": "Restaurant"},
+        {"start": "Reviews", "type": "isAbout", "end": "Restaurant"},
+    ],
+    "metadata": {"constraint": [], "index": []},
+}
+
+
+class GraphStore(LangChainGraphStore):
+    """
+    What GraphCypherQAChain needs from Neo4jGraph. Subclassing the protocol
+    keeps the chain's isinstance check happy without stubbing the writes.
+    """
+    _enhanced_schema = False
+
+    def __init__(self, graph: InMemoryGraph):
+        self.graph = graph
+
+    @property
+    def get_schema(self) -> str:
+        return str(STRUCTURED_SCHEMA)
+
+    @property
+    def get_structured_schema(self) -> dict:
+        return STRUCTURED_SCHEMA
+
+    def refresh_schema(self) -> None:
+        pass
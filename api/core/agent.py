@@ -1,27 +1,41 @@
+import asyncio
 import json
-import os
+import threading
 
 from langchain_core.messages import HumanMessage
 from typing import Annotated
-from langchain.chat_models import init_chat_model
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.constants import START, END
 from langgraph.graph import StateGraph
 from langgraph.graph.message import add_messages
-from langchain_neo4j import Neo4jGraph, GraphCypherQAChain
+from langchain_neo4j import GraphCypherQAChain
+from langchain_neo4j.chains.graph_qa.cypher import extract_cypher
 from pydantic import BaseModel, Field
 from pydantic_core.core_schema import json_or_python_schema
 from typing_extensions import TypedDict
 
-from .ingest_restaurants_api import query_neo4j, download_to_db
+from .ingest_restaurants_api import query_neo4j, aquery_neo4j, city_is_fresh
+from .graph_schema import schema_tracker
+from .answer_cache import answer_cache
+from .checkpointer import checkpointer
+from .dataset_logger import dataset_logger
+from .input_classifier import InputClassifier
+from .intent_router import intent_router
+from .jobs import job_queue
 from .config import settings
+from .metrics import llm_metrics_handler, timed_node
+from . import clients
 
-neo4j_graph = Neo4jGraph(url=settings.NEO4J_URI, username=settings.NEO4J_USER, password=settings.NEO4J_PASSWORD)
+neo4j_graph = clients.neo4j_graph()
+schema_tracker.load(neo4j_graph.get_structured_schema)
 
-llm = init_chat_model(
-    "gpt-5-nano",
-    api_key=settings.OPENAI_API_KEY
-)
+llm = clients.chat_model()
+
+# Tag on the model that writes the final answer, lets the stream tell its tokens apart
+ANSWER_TAG = "final_answer"
+
+input_classifier = InputClassifier(threshold=settings.INPUT_CLASSIFIER_THRESHOLD)
+
+NODES = ("check_input_node", "query_db_node", "fit_db_node")
 
 
 class InputCheck(BaseModel):
@@ -45,22 +59,39 @@ class CityExtraction(BaseModel):
     )
 
 
+def windowed_messages(left: list, right: list) -> list:
+    """
+    add_messages, keeping only the last CHAT_HISTORY_WINDOW messages of a session.
+    """
+    return add_messages(left, right)[-settings.CHAT_HISTORY_WINDOW:]
+
+
 class State(TypedDict):
-    messages: Annotated[list, add_messages]
+    messages: Annotated[list, windowed_messages]
     user_input: str
     user_validation: str | None
     db_check_result: str | None
     next: str | None
     query_db_result: str | None
+    ingest_job: int | None
 
 
-def check_input_node(state: State):
-    print("CHECKING USER INPUT\n\n")
-    valid = llm.with_structured_output(InputCheck).invoke(f"""
+async def _llm_check_input(user_input: str) -> bool:
+    return (await llm.with_structured_output(InputCheck).ainvoke(f"""
     You are food assistant validator. You need to check if user input is related to food.
     Check if this user input is valid:
-    {state['user_input']}
-    """).valid
+    {user_input}
+    """)).valid
+
+
+@timed_node
+async def check_input_node(state: State):
+    print("CHECKING USER INPUT\n\n")
+    valid = input_classifier.classify(state['user_input'])
+    if valid is None:
+        valid = await _llm_check_input(state['user_input'])
+    else:
+        print("INPUT DECIDED LOCALLY\n\n")
 
     if not valid:
         print("❌ USER INPUT IS INVALID\n\n")
@@ -75,61 +106,144 @@ def check_input_node(state: State):
     }
 
 
-def fit_db_node(state: State):
+@timed_node
+async def fit_db_node(state: State):
     print("FITTING NEO4J DATABASE\n\n")
     prompt = f"""
         Extract the city from this message:
         {state["user_input"]}
         """
 
-    result = llm.with_structured_output(CityExtraction).invoke(prompt)
+    result = await llm.with_structured_output(CityExtraction).ainvoke(prompt)
 
-    download_to_db(result.city)
+    if await asyncio.to_thread(city_is_fresh, result.city):
+        # Data for the city is recent, the question is just outside of it
+        print(f"{result.city} IS FRESH, SKIPPING INGEST\n\n")
+        return {}
 
+    # Ingestion takes a while, answer right away and let the job queue do it
+    job = await job_queue.enqueue(result.city)
+    print(f"INGEST JOB {job.id} FOR {result.city}: {job.status}\n\n")
 
-def query_db_node(state: State):
-    print("QUERYING TO ANSWER USER\n\n")
-    neo4j_graph.refresh_schema()
-
-    chain = GraphCypherQAChain.from_llm(
-        llm,
-        graph=neo4j_graph,
-        validate_cypher=True,
-        return_intermediate_steps=True,
-        allow_dangerous_requests=True,
-        verbose=True
+    return {
+        "messages": [
+            f"I don't have data for {result.city} yet. Fetching data for {result.city}, "
+            f"ask me again in a few minutes."
+        ],
+        "ingest_job": job.id,
+    }
+
+
+def _is_empty_value(value) -> bool:
+    # False == 0, but "is it vegan? false" is an answer, not an empty result
+    return value is None or (not isinstance(value, bool) and value == 0) or value == [] or value == {} or value == ""
+
+
+def is_empty_context(contexts: list) -> bool:
+    """
+    Decide from the Cypher result itself whether the graph had nothing to answer with:
+    no rows at all, or only rows of nulls, zero counts and empty collections.
+    """
+    if not contexts:
+        return True
+    return all(
+        all(_is_empty_value(value) for value in row.values()) if isinstance(row, dict) else _is_empty_value(row)
+        for row in contexts
     )
 
-    question = state['user_input']
 
-    result = chain.invoke({"query": question})
+async def _llm_does_not_know(answer: str) -> bool:
+    return (await llm.with_structured_output(BooleanAnswer).ainvoke(f"""
+    Check if this message means "Don't know the answer":
+    {answer}
+    """)).result
+
+
+_chain = None
+_chain_version = -1
+_chain_lock = threading.Lock()
+
+
+def get_chain() -> GraphCypherQAChain:
+    """
+    Return the Cypher QA chain, rebuilt only when the graph schema version moved.
+    """
+    global _chain, _chain_version
+
+    with _chain_lock:
+        version = schema_tracker.version
+        if _chain is None or _chain_version != version:
+            print(f"BUILDING CYPHER CHAIN FOR SCHEMA VERSION {version}\n\n")
+            if _chain is not None:
+                neo4j_graph.refresh_schema()
+                schema_tracker.load(neo4j_graph.get_structured_schema)
+
+            _chain = GraphCypherQAChain.from_llm(
+                cypher_llm=llm,
+                qa_llm=llm.with_config(tags=[ANSWER_TAG]),
+                graph=neo4j_graph,
+                validate_cypher=True,
+                # The chain has no async path of its own, so callbacks (and token streaming)
+                # don't reach its QA step. We run its steps ourselves, see text2cypher.
+                return_direct=True,
+                allow_dangerous_requests=True,
+                verbose=True
+            )
+            _chain_version = version
+
+        return _chain
+
+
+async def text2cypher(chain: GraphCypherQAChain, question: str) -> list[dict]:
+    """
+    The chain's Cypher generation and lookup, awaited instead of run in a worker thread.
+    """
+    cypher = await chain.cypher_generation_chain.ainvoke(
+        {"question": question, "examples": None, "schema": chain.graph_schema}
+    )
+    cypher = extract_cypher(cypher)
+    if chain.cypher_query_corrector:
+        cypher = chain.cypher_query_corrector(cypher)
+    print(f"GENERATED CYPHER: {cypher}\n\n")
+
+    # Empty when the corrector found the query doesn't fit the schema
+    if not cypher:
+        return []
+    return await aquery_neo4j(cypher, span_name="cypher_qa", limit=chain.top_k)
 
-    print(json.dumps(result, indent=2))
 
-    contexts = result['intermediate_steps'][1]['context']
-    answer = result['result']
+@timed_node
+async def query_db_node(state: State):
+    print("QUERYING TO ANSWER USER\n\n")
+    chain = await asyncio.to_thread(get_chain)
 
-    try:
-        dataset_files_count = len(os.listdir('./dataset'))
-    except:
-        dataset_files_count = 0
+    question = state['user_input']
+
+    contexts = None
+    if settings.INTENT_ROUTER_ENABLED:
+        # Matching may load the known cities from Neo4j
+        intent = await asyncio.to_thread(intent_router.match, question)
+        if intent is not None:
+            print(f"INTENT {intent.name}: {intent.params}\n\n")
+            contexts = await intent_router.run(intent)
+            if is_empty_context(contexts):
+                # Maybe asked differently than the template assumes, let Text2Cypher try
+                intent_router.empty += 1
+                contexts = None
+
+    if contexts is None:
+        contexts = await text2cypher(chain, question)
+        print(json.dumps(contexts, indent=2, default=str))
 
-    path = f'./dataset/{dataset_files_count}.json'
-    with open(path, 'w') as f:
-        f.write(json.dumps({
-            "question": question,
-            "contexts": contexts,
-            "answer": answer,
-        }, indent=2))
+    answer = await chain.qa_chain.ainvoke({"question": question, "context": contexts})
 
-    os.chmod(path, 0o777)
+    dataset_logger.log(question=question, contexts=contexts, answer=answer)
 
     print(f'RESULT: {answer}')
 
-    do_not_know = llm.with_structured_output(BooleanAnswer).invoke(f"""
-    Check if this message means "Don't know the answer":
-    {answer}
-    """).result
+    do_not_know = is_empty_context(contexts)
+    if not do_not_know and settings.DONT_KNOW_LLM_FALLBACK:
+        do_not_know = await _llm_does_not_know(answer)
 
     print(f'DO NOT KNOW: {do_not_know}')
 
@@ -150,7 +264,6 @@ graph_builder = StateGraph(State)
 graph_builder.add_node("check_input_node", check_input_node)
 graph_builder.add_node("fit_db_node", fit_db_node)
 graph_builder.add_node("query_db_node", query_db_node)
-graph_builder.add_node("query_db_node_v2", query_db_node)
 
 graph_builder.add_edge(START, "check_input_node")
 graph_builder.add_conditional_edges(
@@ -163,25 +276,75 @@ graph_builder.add_conditional_edges(
     lambda state: state['next'],
 {"fit_db_node": "fit_db_node", "end": END}
 )
-graph_builder.add_edge("fit_db_node", "query_db_node_v2")
-graph_builder.add_edge("query_db_node_v2", END)
-
-checkpointer = MemorySaver()
+graph_builder.add_edge("fit_db_node", END)
 
 graph = graph_builder.compile(checkpointer=checkpointer)
 
 
-def call_graph(message):
+async def call_graph(message, session_id: str):
+    cached = answer_cache.get(message)
+    if cached is not None:
+        print("ANSWER CACHE HIT\n\n")
+        return cached
+
     messages = [HumanMessage(content=message)]
 
     try:
-        state = graph.invoke(
-            {"messages": messages, 'user_input': message},
-            config={"configurable": {"thread_id": 1}}
+        state = await graph.ainvoke(
+            {"messages": messages, 'user_input': message, 'ingest_job': None},
+            config={"configurable": {"thread_id": session_id}, "callbacks": [llm_metrics_handler]}
         )
         messages = state["messages"]
 
-        return messages[-1].content
+        answer = messages[-1].content
+        if state.get("ingest_job") is None:
+            answer_cache.put(message, answer)
+        return answer
     except Exception as e:
         print("Exception", e)
         return '❌ ERROR'
+
+
+async def stream_graph(message, session_id: str):
+    """
+    Run the graph and yield progress events as they happen:
+    node start/end transitions, answer tokens and the final result.
+    """
+    cached = answer_cache.get(message)
+    if cached is not None:
+        yield {"event": "done", "data": {"result": cached, "cached": True}}
+        return
+
+    messages = [HumanMessage(content=message)]
+    result = None
+    ingest_job = None
+
+    try:
+        async for event in graph.astream_events(
+            {"messages": messages, 'user_input': message, 'ingest_job': None},
+            config={"configurable": {"thread_id": session_id}, "callbacks": [llm_metrics_handler]},
+            version="v2",
+        ):
+            kind = event["event"]
+            name = event["name"]
+            node = event.get("metadata", {}).get("langgraph_node")
+
+            if kind == "on_chain_start" and name in NODES:
+                yield {"event": "node", "data": {"node": name, "status": "start"}}
+            elif kind == "on_chain_end" and name in NODES:
+                yield {"event": "node", "data": {"node": name, "status": "end"}}
+            elif kind == "on_chat_model_stream" and ANSWER_TAG in event.get("tags", []):
+                token = event["data"]["chunk"].content
+                if token:
+                    yield {"event": "token", "data": {"node": node, "token": token}}
+            elif kind == "on_chain_end" and name == "LangGraph":
+                output = event["data"]["output"]
+                result = output["messages"][-1].content
+                ingest_job = output.get("ingest_job")
+
+        if result is not None and ingest_job is None:
+            answer_cache.put(message, result)
+        yield {"event": "done", "data": {"result": result, "ingest_job": ingest_job}}
+    except Exception as e:
+        print("Exception", e)
+        yield {"event": "done", "data": {"result": '❌ ERROR'}}
@@ -0,0 +1,87 @@
+"""LRU + TTL cache of final chat answers.
+
+Entries are keyed by the normalized question and the graph schema version.
+Ingesting a city drops every entry that mentions it, plus every entry that
+doesn't mention any city we know about (we can't tell what those depend on).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from .config import settings
+from .graph_schema import schema_tracker
+from .text_utils import normalize
+
+
+def city_stem(city: str) -> str:
+    """
+    Drop the inflected ending so "Warszawa" also matches "w Warszawie".
+    """
+    city = normalize(city)
+    return city[:-2] if len(city) > 5 else city
+
+
+class AnswerCache:
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries: OrderedDict[tuple, tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.known_cities: set[str] = set()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, question: str) -> tuple:
+        return normalize(question), schema_tracker.version
+
+    def get(self, question: str) -> str | None:
+        key = self._key(question)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, question: str, answer: str):
+        key = self._key(question)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_city(self, city: str) -> int:
+        """
+        Drop entries that may depend on data of the given city. Returns the number of dropped entries.
+        """
+        stem = city_stem(city)
+        with self._lock:
+            self.known_cities.add(stem)
+            stale = [
+                key for key in self._entries
+                if stem in key[0] or not any(known in key[0] for known in self.known_cities)
+            ]
+            for key in stale:
+                del self._entries[key]
+
+        print(f"Answer cache: dropped {len(stale)} entries for {city}")
+        return len(stale)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+answer_cache = AnswerCache(maxsize=settings.ANSWER_CACHE_SIZE, ttl=settings.ANSWER_CACHE_TTL)
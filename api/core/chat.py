@@ -1,8 +1,21 @@
+import json
+import uuid
+
 from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from .config import settings
-from .agent import call_graph
+from .agent import call_graph, stream_graph, input_classifier
+from .answer_cache import answer_cache
+from .checkpointer import checkpointer
+from .dataset_logger import dataset_logger
+from .fetcher import fetch_stats
+from .graph_schema import schema_tracker
+from .intent_router import intent_router
+from .search_cache import search_cache, extraction_cache
+from .url_ranking import url_ranker
+from .write_buffer import write_buffer
 from .ingest_restaurants_api import query_neo4j, download_to_db
 
 
@@ -11,12 +24,15 @@ router = APIRouter()
 
 class MessagePayload(BaseModel):
     message: str
+    # Omit to start a new conversation, the id is returned with the answer
+    session_id: str | None = None
 
 
 @router.post(path="/message")
 async def message(payload: MessagePayload):
-    result = call_graph(payload.message)
-    return {"result": result}
+    session_id = payload.session_id or uuid.uuid4().hex
+    result = await call_graph(payload.message, session_id)
+    return {"result": result, "session_id": session_id}
 
     # result = query_neo4j(payload.message)
     # if result == 'NO_RESULTS':
@@ -25,3 +41,43 @@ async def message(payload: MessagePayload):
     #     result = query_neo4j(payload.message)
     # return {"result": result}
 
+
+@router.post(path="/stream")
+async def stream(payload: MessagePayload):
+    session_id = payload.session_id or uuid.uuid4().hex
+
+    async def events():
+        # Flush something right away so the client sees the request was picked up
+        yield f"event: start\ndata: {json.dumps({'session_id': session_id})}\n\n"
+        async for event in stream_graph(payload.message, session_id):
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.delete(path="/sessions/{session_id}")
+async def delete_session(session_id: str):
+    await checkpointer.adelete_thread(session_id)
+    return {"deleted": session_id}
+
+
+@router.get(path="/stats")
+async def stats():
+    return {
+        # Compare with an earlier value to tell whether schema-derived objects are stale
+        "schema_version": schema_tracker.version,
+        "answer_cache": answer_cache.stats(),
+        "input_classifier": input_classifier.stats(),
+        "intent_router": intent_router.stats(),
+        "fetcher": fetch_stats.stats(),
+        "search_cache": search_cache.stats(),
+        "extraction_cache": extraction_cache.stats(),
+        "write_buffer": write_buffer.stats(),
+        "url_ranking": url_ranker.stats(),
+        "dataset": dataset_logger.stats(),
+        "sessions": await checkpointer.stats(),
+    }
@@ -0,0 +1,269 @@
+"""LangGraph checkpointer backed by the application's SQL database.
+
+Only the latest checkpoint of every chat session is kept, the graph never
+travels back in time, so a session costs one row no matter how long it
+runs. Sessions idle for longer than CHAT_SESSION_TTL are deleted, and
+when there are more than CHAT_MAX_SESSIONS the least recently used go
+first. Nothing is held in process memory between requests.
+"""
+
+import asyncio
+import time
+from typing import Any, AsyncIterator, Sequence
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from sqlalchemy import Column, Float, Integer, LargeBinary, String, delete, func, select
+
+from .config import settings
+from .database import AsyncSessionLocal, Base, engine
+
+
+class GraphCheckpoint(Base):
+    __tablename__ = "graph_checkpoints"
+
+    thread_id = Column(String, primary_key=True)
+    checkpoint_ns = Column(String, primary_key=True, default="")
+    checkpoint_id = Column(String, nullable=False)
+    parent_id = Column(String, nullable=True)
+    checkpoint_type = Column(String, nullable=False)
+    checkpoint = Column(LargeBinary, nullable=False)
+    metadata_type = Column(String, nullable=False)
+    checkpoint_metadata = Column("metadata", LargeBinary, nullable=False)
+    updated_at = Column(Float, index=True, nullable=False)
+
+
+class GraphWrite(Base):
+    __tablename__ = "graph_writes"
+
+    thread_id = Column(String, primary_key=True)
+    checkpoint_ns = Column(String, primary_key=True, default="")
+    checkpoint_id = Column(String, primary_key=True)
+    task_id = Column(String, primary_key=True)
+    idx = Column(Integer, primary_key=True)
+    channel = Column(String, nullable=False)
+    value_type = Column(String, nullable=False)
+    value = Column(LargeBinary, nullable=False)
+
+
+class SqlCheckpointSaver(BaseCheckpointSaver):
+    def __init__(self, ttl: int, max_sessions: int, sweep_interval: float):
+        super().__init__()
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sweep_interval = sweep_interval
+        self._table_ready = False
+        self._sweeper: asyncio.Task | None = None
+        self.evicted = 0
+
+    async def _ensure_table(self):
+        if not self._table_ready:
+            async with engine.begin() as conn:
+                await conn.run_sync(GraphCheckpoint.__table__.create, checkfirst=True)
+                await conn.run_sync(GraphWrite.__table__.create, checkfirst=True)
+            self._table_ready = True
+
+    @staticmethod
+    def _ids(config: RunnableConfig) -> tuple[str, str]:
+        configurable = config["configurable"]
+        return str(configurable["thread_id"]), configurable.get("checkpoint_ns", "")
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        await self._ensure_table()
+        thread_id, checkpoint_ns = self._ids(config)
+        async with AsyncSessionLocal() as session:
+            row = await session.get(GraphCheckpoint, (thread_id, checkpoint_ns))
+            if row is None:
+                return None
+            wanted = get_checkpoint_id(config)
+            if wanted and wanted != row.checkpoint_id:
+                return None
+            writes = (await session.execute(
+                select(GraphWrite).where(
+                    GraphWrite.thread_id == thread_id,
+                    GraphWrite.checkpoint_ns == checkpoint_ns,
+                    GraphWrite.checkpoint_id == row.checkpoint_id,
+                ).order_by(GraphWrite.task_id, GraphWrite.idx)
+            )).scalars().all()
+
+        return CheckpointTuple(
+            config={"configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": row.checkpoint_id,
+            }},
+            checkpoint=self.serde.loads_typed((row.checkpoint_type, row.checkpoint)),
+            metadata=self.serde.loads_typed((row.metadata_type, row.checkpoint_metadata)),
+            parent_config={"configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": row.parent_id,
+            }} if row.parent_id else None,
+            pending_writes=[
+                (w.task_id, w.channel, self.serde.loads_typed((w.value_type, w.value))) for w in writes
+            ],
+        )
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        # There is at most one checkpoint per session to list
+        if config is None or before is not None or limit == 0:
+            return
+        checkpoint = await self.aget_tuple(config)
+        if checkpoint is None:
+            return
+        if filter and any(checkpoint.metadata.get(k) != v for k, v in filter.items()):
+            return
+        yield checkpoint
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        await self._ensure_table()
+        thread_id, checkpoint_ns = self._ids(config)
+        checkpoint_type, checkpoint_blob = self.serde.dumps_typed(checkpoint)
+        metadata_type, metadata_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+
+        async with AsyncSessionLocal() as session:
+            await session.merge(GraphCheckpoint(
+                thread_id=thread_id,
+                checkpoint_ns=checkpoint_ns,
+                checkpoint_id=checkpoint["id"],
+                parent_id=config["configurable"].get("checkpoint_id"),
+                checkpoint_type=checkpoint_type,
+                checkpoint=checkpoint_blob,
+                metadata_type=metadata_type,
+                checkpoint_metadata=metadata_blob,
+                updated_at=time.time(),
+            ))
+            # Writes of older checkpoints are never read again
+            await session.execute(delete(GraphWrite).where(
+                GraphWrite.thread_id == thread_id,
+                GraphWrite.checkpoint_ns == checkpoint_ns,
+                GraphWrite.checkpoint_id != checkpoint["id"],
+            ))
+            await session.commit()
+
+        return {"configurable": {
+            "thread_id": thread_id,
+            "checkpoint_ns": checkpoint_ns,
+            "checkpoint_id": checkpoint["id"],
+        }}
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await self._ensure_table()
+        thread_id, checkpoint_ns = self._ids(config)
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        async with AsyncSessionLocal() as session:
+            for i, (channel, value) in enumerate(writes):
+                value_type, value_blob = self.serde.dumps_typed(value)
+                await session.merge(GraphWrite(
+                    thread_id=thread_id,
+                    checkpoint_ns=checkpoint_ns,
+                    checkpoint_id=checkpoint_id,
+                    task_id=task_id,
+                    idx=WRITES_IDX_MAP.get(channel, i),
+                    channel=channel,
+                    value_type=value_type,
+                    value=value_blob,
+                ))
+            await session.commit()
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await self._ensure_table()
+        async with AsyncSessionLocal() as session:
+            await session.execute(delete(GraphCheckpoint).where(GraphCheckpoint.thread_id == str(thread_id)))
+            await session.execute(delete(GraphWrite).where(GraphWrite.thread_id == str(thread_id)))
+            await session.commit()
+
+    async def evict(self) -> int:
+        """
+        Delete idle sessions and, over the cap, the least recently used ones.
+        """
+        await self._ensure_table()
+        async with AsyncSessionLocal() as session:
+            stale = set((await session.execute(
+                select(GraphCheckpoint.thread_id).where(GraphCheckpoint.updated_at < time.time() - self.ttl)
+            )).scalars().all())
+
+            sessions = (await session.execute(
+                select(func.count(func.distinct(GraphCheckpoint.thread_id)))
+            )).scalar_one()
+            excess = sessions - len(stale) - self.max_sessions
+            if excess > 0:
+                oldest = (await session.execute(
+                    select(GraphCheckpoint.thread_id)
+                    .where(GraphCheckpoint.thread_id.not_in(stale))
+                    .group_by(GraphCheckpoint.thread_id)
+                    .order_by(func.max(GraphCheckpoint.updated_at))
+                    .limit(excess)
+                )).scalars().all()
+                stale.update(oldest)
+
+            if stale:
+                await session.execute(delete(GraphCheckpoint).where(GraphCheckpoint.thread_id.in_(stale)))
+                await session.execute(delete(GraphWrite).where(GraphWrite.thread_id.in_(stale)))
+                await session.commit()
+
+        self.evicted += len(stale)
+        return len(stale)
+
+    async def _sweep(self):
+        while True:
+            try:
+                evicted = await self.evict()
+                if evicted:
+                    print(f"Evicted {evicted} chat sessions")
+            except Exception as e:
+                print(f"Chat session eviction failed: {e}")
+            await asyncio.sleep(self.sweep_interval)
+
+    def start(self):
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._sweep())
+
+    async def stop(self):
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.gather(self._sweeper, return_exceptions=True)
+            self._sweeper = None
+
+    async def stats(self) -> dict:
+        await self._ensure_table()
+        async with AsyncSessionLocal() as session:
+            sessions = (await session.execute(
+                select(func.count(func.distinct(GraphCheckpoint.thread_id)))
+            )).scalar_one()
+        return {"sessions": sessions, "evicted": self.evicted}
+
+
+checkpointer = SqlCheckpointSaver(
+    ttl=settings.CHAT_SESSION_TTL,
+    max_sessions=settings.CHAT_MAX_SESSIONS,
+    sweep_interval=settings.CHAT_SESSION_SWEEP_INTERVAL,
+)
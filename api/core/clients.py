@@ -0,0 +1,150 @@
+"""Process-wide registry of Neo4j, OpenAI and HTTP clients.
+
+Clients are created lazily (or eagerly by init() from the FastAPI startup
+hook) and shared by every module in the process. A forked worker process
+must not reuse the sockets it inherited from its parent, so the registry
+remembers the pid it was created in and starts from scratch in a child.
+"""
+
+import os
+import threading
+
+import httpx
+from langchain.chat_models import init_chat_model
+from langchain_neo4j import Neo4jGraph
+from neo4j import AsyncGraphDatabase, GraphDatabase
+from openai import AsyncOpenAI
+
+from .config import settings
+from .metrics import neo4j_span
+
+# Reentrant: a factory may ask for another client (neo4j_graph needs neo4j_driver)
+_lock = threading.RLock()
+_pid = os.getpid()
+_clients: dict = {}
+
+
+def _get(name: str, factory):
+    global _pid
+    with _lock:
+        if _pid != os.getpid():
+            # Forked: drop inherited clients without closing them, they belong to the parent
+            _clients.clear()
+            _pid = os.getpid()
+        if name not in _clients:
+            _clients[name] = factory()
+        return _clients[name]
+
+
+def _neo4j_config() -> dict:
+    return {
+        "auth": (settings.NEO4J_USER, settings.NEO4J_PASSWORD),
+        "max_connection_pool_size": settings.NEO4J_POOL_SIZE,
+        "connection_acquisition_timeout": settings.NEO4J_ACQUISITION_TIMEOUT,
+        "max_connection_lifetime": settings.NEO4J_CONNECTION_LIFETIME,
+        "keep_alive": True,
+    }
+
+
+def neo4j_driver():
+    return _get("neo4j", lambda: GraphDatabase.driver(settings.NEO4J_URI, **_neo4j_config()))
+
+
+def async_neo4j_driver():
+    return _get("async_neo4j", lambda: AsyncGraphDatabase.driver(settings.NEO4J_URI, **_neo4j_config()))
+
+
+def async_openai_client() -> AsyncOpenAI:
+    return _get("async_openai", lambda: AsyncOpenAI(api_key=settings.OPENAI_API_KEY))
+
+
+def chat_model():
+    return _get("chat_model", lambda: init_chat_model("gpt-5-nano", api_key=settings.OPENAI_API_KEY))
+
+
+class TimedNeo4jGraph(Neo4jGraph):
+    """
+    Neo4jGraph on the shared sync driver, timing its schema queries. The QA chain's Cypher runs on the async driver.
+    """
+
+    def __init__(self, driver, database: str = "neo4j"):
+        # Neo4jGraph.__init__ always opens a driver of its own, set up the same state around ours instead
+        self._driver = driver
+        self._database = database
+        self.timeout = None
+        self.sanitize = False
+        self._enhanced_schema = False
+        self.schema = ""
+        self.structured_schema = {}
+        self.refresh_schema()
+
+    def query(self, query: str, params: dict = {}, session_params: dict = {}):
+        with neo4j_span("graph_schema", cypher=query) as span:
+            rows = super().query(query, params, session_params)
+            span.set(rows=len(rows))
+        return rows
+
+    def close(self):
+        # The driver belongs to the registry, closed with the other clients
+        pass
+
+
+def neo4j_graph() -> Neo4jGraph:
+    """
+    LangChain graph wrapper used by the Cypher QA chain, sharing the sync driver's pool.
+    """
+    return _get("neo4j_graph", lambda: TimedNeo4jGraph(neo4j_driver()))
+
+
+def async_http_client() -> httpx.AsyncClient:
+    """
+    Keep-alive async client for the enrichment pipeline.
+    """
+    return _get("async_http", lambda: httpx.AsyncClient(
+        follow_redirects=True,
+        max_redirects=settings.FETCH_MAX_REDIRECTS,
+        timeout=settings.HTTP_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_POOL_SIZE * 4,
+            max_keepalive_connections=settings.HTTP_POOL_SIZE,
+        ),
+    ))
+
+
+def install(**overrides):
+    """
+    Register ready-made clients by name (e.g. neo4j_graph=..., chat_model=...), like local stand-ins for benchmarks.
+    """
+    names = {"neo4j_graph": "neo4j_graph", "chat_model": "chat_model", "neo4j_driver": "neo4j",
+             "async_neo4j_driver": "async_neo4j", "async_openai_client": "async_openai",
+             "async_http_client": "async_http"}
+    with _lock:
+        for name, client in overrides.items():
+            _clients[names[name]] = client
+
+
+def init():
+    neo4j_driver()
+    async_neo4j_driver()
+    async_openai_client()
+    async_http_client()
+    chat_model()
+    neo4j_graph()
+    print("✅ Clients ready")
+
+
+async def close():
+    with _lock:
+        clients = dict(_clients) if _pid == os.getpid() else {}
+        _clients.clear()
+
+    for name, client in clients.items():
+        try:
+            if name in ("async_neo4j", "async_openai"):
+                await client.close()
+            elif name == "async_http":
+                await client.aclose()
+            elif hasattr(client, "close"):
+                client.close()
+        except Exception as e:
+            print(f"Failed to close {name} client: {e}")
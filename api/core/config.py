@@ -24,6 +24,87 @@ class Settings(BaseSettings):
     NEO4J_URI: str = "your-neo4j-uri"
     NEO4J_USER: str = "your-neo4j-user"
     NEO4J_PASSWORD: str = "your-neo4j-password"
+    NEO4J_POOL_SIZE: int = 50
+    NEO4J_ACQUISITION_TIMEOUT: float = 30.0  # seconds
+    NEO4J_CONNECTION_LIFETIME: int = 60 * 60  # seconds
+
+    # HTTP
+    HTTP_POOL_SIZE: int = 32
+    HTTP_TIMEOUT: float = 20.0  # seconds
+
+    # Page fetcher
+    FETCH_CONNECT_TIMEOUT: float = 5.0  # seconds
+    FETCH_READ_TIMEOUT: float = 10.0  # seconds between bytes
+    FETCH_TOTAL_TIMEOUT: float = 30.0  # seconds for the whole page
+    FETCH_MAX_BYTES: int = 3 * 1024 * 1024  # bytes downloaded
+    FETCH_MAX_DECODED_BYTES: int = 10 * 1024 * 1024  # bytes after decompression
+    FETCH_MAX_REDIRECTS: int = 5
+
+    # Search / geocoding response cache: "normal", "replay" (cache only, no network) or "off"
+    SEARCH_CACHE_MODE: str = "normal"
+    SEARCH_CACHE_NOMINATIM_TTL: int = 30 * 24 * 60 * 60  # seconds
+    SEARCH_CACHE_DDGS_TTL: int = 7 * 24 * 60 * 60  # seconds
+    SEARCH_CACHE_MAX_BYTES: int = 200 * 1024 * 1024
+
+    # LLM extraction cache, keyed by page content + prompt + model
+    EXTRACTION_CACHE_TTL: int = 90 * 24 * 60 * 60  # seconds
+    EXTRACTION_CACHE_MAX_BYTES: int = 100 * 1024 * 1024
+
+    # Answer cache
+    ANSWER_CACHE_SIZE: int = 1024
+    ANSWER_CACHE_TTL: int = 60 * 60  # seconds
+
+    # Local input classifier, confidence needed to skip the LLM validator
+    INPUT_CLASSIFIER_THRESHOLD: float = 0.8
+
+    # Parameterized Cypher templates for common question shapes, Text2Cypher for the rest
+    INTENT_ROUTER_ENABLED: bool = True
+    INTENT_CITY_REFRESH: int = 5 * 60  # seconds between reloads of the known city names
+    INTENT_RESULT_LIMIT: int = 10  # rows a template returns
+    FULLTEXT_ANALYZER: str = "polish"  # used when Neo4j has it, standard-folding otherwise
+    FULLTEXT_CANDIDATES_FACTOR: int = 5  # index hits per wanted row, some are outside the asked city
+    PROXIMITY_START_RADIUS: float = 500.0  # meters searched first for the nearest restaurants
+    PROXIMITY_MAX_RADIUS: float = 20_000.0  # meters, the radius doubles up to this
+
+    # Ask the LLM whether a non-empty Cypher result still means "don't know"
+    DONT_KNOW_LLM_FALLBACK: bool = False
+
+    # Print every timing span as a JSON line
+    METRICS_LOG_SPANS: bool = False
+
+    # Chat sessions, checkpointed to the SQL database
+    CHAT_HISTORY_WINDOW: int = 20  # messages kept in a session's graph state
+    CHAT_SESSION_TTL: int = 24 * 60 * 60  # seconds a session may stay idle
+    CHAT_MAX_SESSIONS: int = 10_000
+    CHAT_SESSION_SWEEP_INTERVAL: float = 5 * 60  # seconds between eviction runs
+
+    # Q&A samples appended as JSONL by the dataset logger
+    DATASET_ENABLED: bool = True
+    DATASET_DIR: str = "./dataset"
+    DATASET_SAMPLE_RATE: float = 1.0  # share of samples kept
+    DATASET_QUEUE_SIZE: int = 1000  # samples waiting to be written before new ones are dropped
+    DATASET_MAX_FILE_BYTES: int = 50 * 1024 * 1024
+    DATASET_ROTATE_SECONDS: int = 24 * 60 * 60
+
+    # Ingestion
+    INGEST_WORKERS: int = 2  # cities ingested at the same time
+    INGEST_PROGRESS_INTERVAL: float = 2.0  # seconds between saves of a running job's progress
+    ENRICH_CONCURRENCY: int = 200  # restaurants enriched at the same time
+    ENRICH_SEARCH_CONCURRENCY: int = 4
+    ENRICH_PER_HOST_CONCURRENCY: int = 2
+    ENRICH_LLM_CONCURRENCY: int = 32
+    WRITE_BATCH_SIZE: int = 2000  # menu / review rows per UNWIND transaction
+    WRITE_FLUSH_INTERVAL: float = 2.0  # seconds a row may wait in the write buffer
+    WRITE_RETRIES: int = 3
+    URL_RANKING_MODE: str = "heuristic"  # "heuristic" (local scoring) or "llm"
+    URL_RANKING_LLM_TIEBREAK: bool = True  # ask the LLM when the best two results score within the margin
+    URL_RANKING_TIE_MARGIN: float = 1.0
+    URL_RANKING_BATCH_SIZE: int = 25  # restaurants per ranking call
+    URL_RANKING_BATCH_WINDOW: float = 0.5  # seconds to wait for more restaurants to batch
+    PROBE_TOP_K: int = 3  # candidate pages fetched at the same time per restaurant
+    PROBE_MIN_MATCHES: int = 2  # price / review hits a page needs before it goes to the LLM
+    LLM_PAGE_TOKEN_BUDGET: int = 12_000  # tokens of page text sent to the extraction LLM
+    CITY_FRESHNESS_TTL: int = 7 * 24 * 60 * 60  # seconds before a city or restaurant is re-ingested
 
     @field_validator("ALLOWED_ORIGINS", mode="before")
     def parse_allowed_origins(cls, v):
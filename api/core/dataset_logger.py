@@ -0,0 +1,158 @@
+"""Q&A dataset sink.
+
+query_db_node hands every (question, contexts, answer) sample to the logger,
+which only puts it on a bounded queue. A background thread appends the
+samples as JSONL to DATASET_DIR, starting a new file once the current one
+exceeds DATASET_MAX_FILE_BYTES or is older than DATASET_ROTATE_SECONDS.
+When the queue is full the sample is dropped and counted rather than
+slowing the chat down.
+"""
+
+import json
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+
+from .config import settings
+
+_STOP = object()
+
+
+class DatasetLogger:
+    def __init__(self, directory: str, enabled: bool, sample_rate: float, queue_size: int,
+                 max_file_bytes: int, rotate_seconds: int):
+        self.directory = directory
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.max_file_bytes = max_file_bytes
+        self.rotate_seconds = rotate_seconds
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._file = None
+        self._file_opened_at = 0.0
+
+        self.logged = 0
+        self.written = 0
+        self.dropped = 0
+        self.sampled_out = 0
+        self.errors = 0
+        self.rotations = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="dataset-logger", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Write out what is queued and close the current file.
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            pass
+        thread.join(timeout)
+
+    def log(self, **sample):
+        """
+        Queue a sample, never blocks.
+        """
+        if not self.enabled:
+            return
+        if self.sample_rate < 1.0 and random.random() >= self.sample_rate:
+            self.sampled_out += 1
+            return
+        if self._thread is None:
+            self.start()
+
+        sample["logged_at"] = time.time()
+        try:
+            self._queue.put_nowait(sample)
+            self.logged += 1
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            sample = self._queue.get()
+            if sample is _STOP:
+                break
+            batch = [sample]
+            # Drain whatever else is waiting so one flush covers many samples
+            while len(batch) < 256:
+                try:
+                    sample = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if sample is _STOP:
+                    self._write(batch)
+                    self._close()
+                    return
+                batch.append(sample)
+            self._write(batch)
+        self._close()
+
+    def _write(self, batch: list[dict]):
+        try:
+            f = self._current_file()
+            for sample in batch:
+                f.write(json.dumps(sample, ensure_ascii=False, default=str) + "\n")
+            f.flush()
+            self.written += len(batch)
+        except (OSError, TypeError, ValueError) as e:
+            self.errors += len(batch)
+            print(f"Dataset write failed: {e}")
+
+    def _current_file(self):
+        now = time.time()
+        if self._file is not None and (
+            self._file.tell() >= self.max_file_bytes or now - self._file_opened_at >= self.rotate_seconds
+        ):
+            self._close()
+            self.rotations += 1
+
+        if self._file is None:
+            os.makedirs(self.directory, exist_ok=True)
+            # Timestamp + random suffix, so several app processes never share a file
+            name = f"{time.strftime('%Y%m%d-%H%M%S', time.gmtime(now))}-{uuid.uuid4().hex[:8]}.jsonl"
+            path = os.path.join(self.directory, name)
+            self._file = open(path, "a", encoding="utf-8")
+            os.chmod(path, 0o666)
+            self._file_opened_at = now
+        return self._file
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "queued": self._queue.qsize(),
+            "logged": self.logged,
+            "written": self.written,
+            "dropped": self.dropped,
+            "sampled_out": self.sampled_out,
+            "errors": self.errors,
+            "rotations": self.rotations,
+        }
+
+
+dataset_logger = DatasetLogger(
+    directory=settings.DATASET_DIR,
+    enabled=settings.DATASET_ENABLED,
+    sample_rate=settings.DATASET_SAMPLE_RATE,
+    queue_size=settings.DATASET_QUEUE_SIZE,
+    max_file_bytes=settings.DATASET_MAX_FILE_BYTES,
+    rotate_seconds=settings.DATASET_ROTATE_SECONDS,
+)
@@ -0,0 +1,150 @@
+"""Page fetcher shared by the menu and review scrapers.
+
+Pages are streamed and the download stops at a byte cap, so a slow site, a
+multi-MB PDF or an endless stream can't hold a worker forever. Responses
+with an unwanted content type are dropped before the body is read.
+"""
+
+import asyncio
+import threading
+import time
+from dataclasses import dataclass
+
+import httpx
+
+from . import clients
+from .config import settings
+from .metrics import fetch_bytes, fetch_seconds
+
+ALLOWED_CONTENT_TYPES = {
+    "text/html",
+    "application/xhtml+xml",
+    "text/plain",
+    "application/json",
+    "application/ld+json",
+}
+
+DENIED_CONTENT_PREFIXES = (
+    "application/pdf",
+    "application/zip",
+    "application/octet-stream",
+    "image/",
+    "video/",
+    "audio/",
+    "font/",
+)
+
+
+class FetchError(Exception):
+    pass
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status: int
+    content_type: str
+    text: str
+    downloaded_bytes: int
+    decoded_bytes: int
+    elapsed: float
+    truncated: bool
+
+
+class FetchStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fetches = 0
+        self.errors = 0
+        self.truncated = 0
+        self.downloaded_bytes = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def record(self, elapsed: float, downloaded_bytes: int = 0, truncated: bool = False, error: bool = False):
+        with self._lock:
+            self.fetches += 1
+            self.errors += error
+            self.truncated += truncated
+            self.downloaded_bytes += downloaded_bytes
+            self.latency_total += elapsed
+            self.latency_max = max(self.latency_max, elapsed)
+
+    def stats(self) -> dict:
+        return {
+            "fetches": self.fetches,
+            "errors": self.errors,
+            "truncated": self.truncated,
+            "downloaded_bytes": self.downloaded_bytes,
+            "latency_avg": self.latency_total / self.fetches if self.fetches else 0.0,
+            "latency_max": self.latency_max,
+        }
+
+
+fetch_stats = FetchStats()
+
+
+def _check_content_type(content_type: str):
+    if content_type.startswith(DENIED_CONTENT_PREFIXES):
+        raise FetchError(f"Denied content type {content_type}")
+    if content_type and content_type not in ALLOWED_CONTENT_TYPES:
+        raise FetchError(f"Unsupported content type {content_type}")
+
+
+async def _fetch(url: str, headers: dict, started: float) -> FetchResult:
+    timeout = httpx.Timeout(settings.FETCH_READ_TIMEOUT, connect=settings.FETCH_CONNECT_TIMEOUT)
+    async with clients.async_http_client().stream("GET", url, headers=headers, timeout=timeout) as response:
+        response.raise_for_status()
+        content_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+        _check_content_type(content_type)
+
+        chunks = []
+        decoded = 0
+        truncated = False
+        async for chunk in response.aiter_bytes():
+            chunks.append(chunk)
+            decoded += len(chunk)
+            if response.num_bytes_downloaded >= settings.FETCH_MAX_BYTES:
+                truncated = True
+                break
+            if decoded >= settings.FETCH_MAX_DECODED_BYTES:
+                # Compressed body inflating way past the download cap
+                truncated = True
+                break
+
+        body = b"".join(chunks)[:settings.FETCH_MAX_DECODED_BYTES]
+        return FetchResult(
+            url=str(response.url),
+            status=response.status_code,
+            content_type=content_type,
+            text=body.decode(response.encoding or "utf-8", errors="replace"),
+            downloaded_bytes=response.num_bytes_downloaded,
+            decoded_bytes=len(body),
+            elapsed=time.monotonic() - started,
+            truncated=truncated,
+        )
+
+
+async def fetch_page(url: str, headers: dict | None = None) -> FetchResult:
+    """
+    Fetch a page within the configured deadlines and size caps. Raises FetchError on any failure.
+    """
+    started = time.monotonic()
+    try:
+        async with asyncio.timeout(settings.FETCH_TOTAL_TIMEOUT):
+            result = await _fetch(url, headers or {}, started)
+    except (FetchError, httpx.HTTPError, TimeoutError) as e:
+        elapsed = time.monotonic() - started
+        fetch_stats.record(elapsed, error=True)
+        fetch_seconds.observe(elapsed, status="error")
+        print(f"Fetch of {url} failed after {elapsed:.2f}s: {e!r}")
+        raise FetchError(str(e) or type(e).__name__) from e
+
+    fetch_stats.record(result.elapsed, result.downloaded_bytes, result.truncated)
+    fetch_seconds.observe(result.elapsed, status="truncated" if result.truncated else "ok")
+    fetch_bytes.inc(result.downloaded_bytes)
+    print(
+        f"Fetched {url} in {result.elapsed:.2f}s, {result.downloaded_bytes} bytes"
+        f"{' (truncated)' if result.truncated else ''}"
+    )
+    return result
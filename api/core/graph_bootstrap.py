@@ -0,0 +1,114 @@
+"""Neo4j constraints, indexes and data migrations.
+
+Run once at startup. Every MERGE key used by the ingestion code is backed by
+a uniqueness constraint (and so by an index), which keeps MERGE an index
+seek instead of a label scan as the graph grows. Dish names and review
+texts get full-text indexes for core/text_search.py.
+"""
+
+from neo4j.exceptions import Neo4jError
+
+from . import clients
+from .search_reviews import review_hash
+from .text_search import choose_analyzer, fulltext_index_statements
+
+CONSTRAINTS = [
+    "CREATE CONSTRAINT restaurant_name_city IF NOT EXISTS FOR (r:Restaurant) REQUIRE (r.name, r.city) IS UNIQUE",
+    "CREATE CONSTRAINT menu_name IF NOT EXISTS FOR (m:Menu) REQUIRE m.name IS UNIQUE",
+    "CREATE CONSTRAINT reviews_hash IF NOT EXISTS FOR (r:Reviews) REQUIRE r.hash IS UNIQUE",
+    "CREATE CONSTRAINT city_key IF NOT EXISTS FOR (c:City) REQUIRE c.key IS UNIQUE",
+]
+
+INDEXES = [
+    "CREATE INDEX restaurant_name IF NOT EXISTS FOR (r:Restaurant) ON (r.name)",
+    "CREATE INDEX restaurant_city IF NOT EXISTS FOR (r:Restaurant) ON (r.city)",
+    # Radius / nearest lookups of core/proximity.py
+    "CREATE POINT INDEX restaurant_location IF NOT EXISTS FOR (r:Restaurant) ON (r.location)",
+]
+
+BATCH_SIZE = 1000
+
+
+# Point the relationships of a duplicate review at the one kept, then drop the duplicate
+MERGE_DUPLICATE = """
+OPTIONAL MATCH (dup)-[:isAbout]->(rest:Restaurant)
+WITH keep, dup, collect(rest) AS restaurants
+FOREACH (rest IN restaurants | MERGE (keep)-[:isAbout]->(rest))
+DETACH DELETE dup
+"""
+
+SET_HASHES = """
+UNWIND $rows AS row
+MATCH (r:Reviews) WHERE elementId(r) = row.id
+OPTIONAL MATCH (existing:Reviews {hash: row.hash})
+FOREACH (ignore IN CASE WHEN existing IS NULL THEN [1] ELSE [] END | SET r.hash = row.hash)
+WITH existing AS keep, r AS dup WHERE keep IS NOT NULL
+""" + MERGE_DUPLICATE
+
+MERGE_HASHED_DUPLICATES = """
+MATCH (r:Reviews) WHERE r.hash IS NOT NULL
+WITH r.hash AS hash, collect(r) AS nodes WHERE size(nodes) > 1
+WITH nodes[0] AS keep, nodes[1..] AS dups
+UNWIND dups AS dup
+""" + MERGE_DUPLICATE
+
+
+def migrate_reviews_hash(session):
+    """
+    Reviews used to be keyed on their full text, give the old ones a content hash.
+    A review whose hash is already taken is merged into the review holding it,
+    so the reviews_hash constraint can be created.
+    """
+    constrained = session.run("SHOW CONSTRAINTS YIELD name WHERE name = 'reviews_hash' RETURN name").single()
+    if constrained is None:
+        # Left over by earlier runs of this migration, which only deduplicated within a batch
+        summary = session.run(MERGE_HASHED_DUPLICATES).consume()
+        if summary.counters.nodes_deleted:
+            print(f"⚠️ Merged {summary.counters.nodes_deleted} duplicate reviews")
+
+    merged = 0
+    while True:
+        records = list(session.run(
+            """
+            MATCH (r:Reviews) WHERE r.hash IS NULL
+            RETURN elementId(r) AS id, r.name AS name
+            LIMIT $limit
+            """,
+            limit=BATCH_SIZE,
+        ))
+        if not records:
+            break
+
+        # Every review leaves the unhashed set: hashed, or merged into the review with its hash.
+        # Duplicates within the batch go in a second statement, which sees the first one's hashes.
+        first, repeated, hashes = [], [], set()
+        for record in records:
+            value = review_hash(record["name"] or "")
+            (repeated if value in hashes else first).append({"id": record["id"], "hash": value})
+            hashes.add(value)
+
+        for rows in (first, repeated):
+            if rows:
+                merged += session.run(SET_HASHES, rows=rows).consume().counters.nodes_deleted
+
+    if merged:
+        print(f"⚠️ Merged {merged} reviews with the same text into one")
+
+
+def bootstrap_schema():
+    with clients.neo4j_driver().session() as session:
+        migrate_reviews_hash(session)
+
+        analyzers = [record["analyzer"] for record in session.run(
+            "CALL db.index.fulltext.listAvailableAnalyzers() YIELD analyzer RETURN analyzer"
+        )]
+        fulltext = fulltext_index_statements(choose_analyzer(analyzers))
+
+        for statement in CONSTRAINTS + INDEXES + fulltext:
+            try:
+                session.run(statement).consume()
+            except Neo4jError as e:
+                # Usually duplicates left over from before the constraint existed
+                print(f"⚠️ Could not apply `{statement}`: {e.message}")
+
+    print("✅ Neo4j schema ready")
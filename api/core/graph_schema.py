@@ -0,0 +1,58 @@
+"""Process-wide snapshot of the Neo4j graph schema.
+
+Writers report the labels, relationship types and properties they touch.
+The version only moves when something new shows up, so readers holding a
+schema-derived object (like the Cypher QA chain) know when to rebuild it.
+"""
+
+import threading
+from typing import Any, Dict, Iterable, Tuple
+
+
+class SchemaTracker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.labels: set[str] = set()
+        self.rel_types: set[str] = set()
+        self.properties: set[Tuple[str, str]] = set()
+        self.version = 0
+
+    def load(self, structured_schema: Dict[str, Any]):
+        """
+        Seed the known schema from Neo4jGraph.get_structured_schema, without bumping the version.
+        """
+        with self._lock:
+            for label, props in structured_schema.get("node_props", {}).items():
+                self.labels.add(label)
+                self.properties.update((label, p["property"]) for p in props)
+            for rel_type, props in structured_schema.get("rel_props", {}).items():
+                self.rel_types.add(rel_type)
+                self.properties.update((rel_type, p["property"]) for p in props)
+            for rel in structured_schema.get("relationships", []):
+                self.rel_types.add(rel["type"])
+
+    def record_write(
+            self,
+            labels: Iterable[str] = (),
+            rel_types: Iterable[str] = (),
+            properties: Iterable[Tuple[str, str]] = (),
+    ) -> bool:
+        """
+        Register the shape of a write. Returns True (and bumps the version) if it added anything new.
+        """
+        with self._lock:
+            new_labels = set(labels) - self.labels
+            new_rel_types = set(rel_types) - self.rel_types
+            new_properties = set(properties) - self.properties
+            if not (new_labels or new_rel_types or new_properties):
+                return False
+
+            self.labels |= new_labels
+            self.rel_types |= new_rel_types
+            self.properties |= new_properties
+            self.version += 1
+            print(f"Graph schema changed, version {self.version}")
+            return True
+
+
+schema_tracker = SchemaTracker()
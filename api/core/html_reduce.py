@@ -0,0 +1,148 @@
+"""Shrink scraped pages before they are sent to the LLM.
+
+Raw pages are mostly scripts, styles, inline SVG and navigation. We drop
+all of that, keep schema.org Menu / Review JSON-LD as is, keep the lines
+around prices (menus) or ratings (reviews) and fill whatever budget is left
+with the rest of the page text.
+"""
+
+import json
+import re
+from dataclasses import dataclass
+
+from lxml import etree, html as lxml_html
+
+from .config import settings
+
+# Rough average for mixed Polish / English text
+CHARS_PER_TOKEN = 4
+
+DROP_TAGS = [
+    "script", "style", "noscript", "svg", "canvas", "iframe", "template", "head",
+    "nav", "header", "footer", "form", "button", "select", "picture", "video", "audio",
+]
+
+BLOCK_TAGS = [
+    "p", "div", "section", "article", "li", "tr", "dt", "dd", "br",
+    "h1", "h2", "h3", "h4", "h5", "h6", "table", "ul", "ol", "dl",
+]
+
+PRICE_PATTERN = re.compile(
+    r"(\d+[.,]?\d{0,2}\s?(zł|zl|pln|€|eur|\$|usd|£|kč|czk)(?!\w))|((zł|pln|€|\$|£)\s?\d+[.,]?\d{0,2})",
+    re.IGNORECASE,
+)
+
+REVIEW_PATTERN = re.compile(
+    r"(★|☆|\b\d[.,]?\d?\s?/\s?(5|10)\b|\bopini|\brecenzj|\bocen|\breview|\brated\b|\bstars?\b|"
+    r"\bgwiazd|\bpolecam|\bnie polecam|\bbewertung)",
+    re.IGNORECASE,
+)
+
+JSON_LD_TYPES = {
+    "menu": {"Menu", "MenuSection", "MenuItem", "Offer"},
+    "review": {"Review", "AggregateRating", "Rating"},
+}
+
+# Lines kept around every match: (before, after)
+WINDOWS = {
+    "menu": (2, 1),
+    "review": (1, 3),
+}
+
+
+@dataclass
+class ReducedPage:
+    text: str
+    original_chars: int
+    reduced_chars: int
+    # JSON-LD blocks plus lines matching the price / review pattern
+    matches: int = 0
+
+    @property
+    def ratio(self) -> float:
+        return self.reduced_chars / self.original_chars if self.original_chars else 0.0
+
+
+def _types(node) -> set[str]:
+    value = node.get("@type", [])
+    return set(value) if isinstance(value, list) else {value}
+
+
+def _walk_json_ld(node, wanted: set[str], found: list):
+    if isinstance(node, list):
+        for item in node:
+            _walk_json_ld(item, wanted, found)
+    elif isinstance(node, dict):
+        if _types(node) & wanted:
+            found.append(node)
+            return
+        for value in node.values():
+            _walk_json_ld(value, wanted, found)
+
+
+def _json_ld(root, kind: str) -> list[str]:
+    found = []
+    for script in root.xpath('//script[@type="application/ld+json"]'):
+        try:
+            data = json.loads(script.text_content())
+        except ValueError:
+            continue
+        _walk_json_ld(data, JSON_LD_TYPES[kind], found)
+    return [json.dumps(node, ensure_ascii=False, separators=(",", ":")) for node in found]
+
+
+def _lines(root) -> list[str]:
+    etree.strip_elements(root, *DROP_TAGS, with_tail=False)
+    etree.strip_elements(root, etree.Comment, with_tail=False)
+    for el in root.iter(*BLOCK_TAGS):
+        el.tail = "\n" + (el.tail or "")
+    # Keep table rows on one line, a dish and its price usually sit in neighbouring cells
+    for el in root.iter("td", "th"):
+        el.tail = " | " + (el.tail or "")
+
+    lines = []
+    for line in root.text_content().splitlines():
+        line = " ".join(line.split())
+        if line and (not lines or lines[-1] != line):
+            lines.append(line)
+    return lines
+
+
+def reduce_html(page: str, kind: str, token_budget: int | None = None) -> ReducedPage:
+    """
+    Reduce an html page to a text excerpt relevant for kind ("menu" or "review"),
+    at most token_budget tokens long.
+    """
+    budget = (token_budget or settings.LLM_PAGE_TOKEN_BUDGET) * CHARS_PER_TOKEN
+
+    try:
+        # page is already decoded: parse it as utf-8 bytes so an <?xml encoding=...?> declaration
+        # is neither rejected nor trusted. A parser per call, lxml parsers aren't thread safe
+        root = lxml_html.document_fromstring(page.encode(), parser=lxml_html.HTMLParser(encoding="utf-8"))
+    except (etree.ParserError, ValueError):
+        return ReducedPage(text="", original_chars=len(page), reduced_chars=0)
+
+    parts = _json_ld(root, kind)
+    lines = _lines(root)
+
+    pattern = PRICE_PATTERN if kind == "menu" else REVIEW_PATTERN
+    before, after = WINDOWS[kind]
+    keep = set()
+    matches = len(parts)
+    for index, line in enumerate(lines):
+        if pattern.search(line):
+            matches += 1
+            keep.update(range(max(0, index - before), min(len(lines), index + after + 1)))
+
+    # Candidate regions first, in page order, then the rest of the page while budget lasts
+    ordered = [lines[i] for i in sorted(keep)] + [line for i, line in enumerate(lines) if i not in keep]
+
+    used = sum(len(part) + 1 for part in parts)
+    for line in ordered:
+        if used + len(line) + 1 > budget:
+            break
+        parts.append(line)
+        used += len(line) + 1
+
+    text = "\n".join(parts)[:budget]
+    return ReducedPage(text=text, original_chars=len(page), reduced_chars=len(text), matches=matches)
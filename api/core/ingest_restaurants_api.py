@@ -13,26 +13,33 @@ Usage:
 """
 
 import argparse
+import asyncio
 import os
 import sys
-from typing import List, Dict, Any
+import time
+from typing import Callable, List, Dict, Any, Optional
 
 from .config import settings
+from . import clients
 from . import search_reviews
 from . import search_web
-from multiprocessing import Pool
+from .graph_schema import schema_tracker
+from .answer_cache import answer_cache
+from .intent_router import intent_router
+from .limits import enrichment_limits
+from .metrics import neo4j_span
+from .search_cache import search_cache
+from .write_buffer import write_buffer
+from .text_utils import normalize
 
 try:
-    from neo4j import GraphDatabase, Result, Record
+    from neo4j import Result, Record
 except Exception:
     print(
         "Missing neo4j-driver. Install with: pip install neo4j-driver", file=sys.stderr
     )
     sys.exit(1)
 
-import requests
-
-driver = GraphDatabase.driver(settings.NEO4J_URI, auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD))
 
 headers = {
     'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_11_5) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/50.0.2661.102 Safari/537.36'}
@@ -103,6 +110,10 @@ def normalize_item(item: Dict[str, Any]) -> Dict[str, Any]:
     state = address.get("state", "")
     country = address.get("country", "")
     place_rank = item.get("place_rank", "")
+    try:
+        lat, lon = float(item["lat"]), float(item["lon"])
+    except (KeyError, TypeError, ValueError):
+        lat = lon = None
     return {
         "name": name,
         # "city_block": city_block,
@@ -112,26 +123,134 @@ def normalize_item(item: Dict[str, Any]) -> Dict[str, Any]:
         "city": city,
         "country": country,
         "place_rank": place_rank,
+        "lat": lat,
+        "lon": lon,
     }
 
 
+# Shape of what load_restaurants writes
+SCHEMA = {
+    "labels": ["Restaurant"],
+    "properties": [
+        ("Restaurant", "name"),
+        ("Restaurant", "city"),
+        ("Restaurant", "country"),
+        ("Restaurant", "place_rank"),
+        ("Restaurant", "location"),
+    ],
+}
+
+
 def load_restaurants(tx, rows: List[Dict[str, Any]]):
     tx.run(
         """
         UNWIND $rows AS row
-        MERGE (r:Restaurant {name: row.name})
+        MERGE (r:Restaurant {name: row.name, city: row.city})
         SET 
-            r.city = row.city,
             r.country = row.country,
-            r.place_rank = row.place_rank
+            r.place_rank = row.place_rank,
+            r.location = CASE
+                WHEN row.lat IS NULL THEN r.location
+                ELSE point({latitude: row.lat, longitude: row.lon})
+            END
         """,
         rows=rows,
     )
 
 
 def ingest(rows: List[Dict[str, Any]]):
-    with driver.session() as session:
+    with neo4j_span("restaurant_insert") as span, clients.neo4j_driver().session() as session:
         session.execute_write(load_restaurants, rows)
+        span.set(rows=len(rows))
+    schema_tracker.record_write(**SCHEMA)
+
+
+# Shape of what record_city_coverage writes
+CITY_SCHEMA = {
+    "labels": ["City"],
+    "properties": [
+        ("City", "key"),
+        ("City", "name"),
+        ("City", "ingested_at"),
+        ("City", "restaurant_count"),
+        ("City", "menu_count"),
+        ("City", "review_count"),
+    ],
+}
+
+
+def get_city_coverage(place: str) -> Optional[Dict[str, Any]]:
+    """
+    Return what we know about the last ingest of the city, or None if it was never ingested.
+    """
+    with neo4j_span("city_coverage"), clients.neo4j_driver().session() as session:
+        record = session.run(
+            """
+            MATCH (c:City {key: $key})
+            RETURN c.name AS name, c.ingested_at AS ingested_at, c.restaurant_count AS restaurant_count,
+                   c.menu_count AS menu_count, c.review_count AS review_count
+            """,
+            key=normalize(place),
+        ).single()
+    return record.data() if record else None
+
+
+def is_fresh(timestamp: Optional[float]) -> bool:
+    return timestamp is not None and time.time() - timestamp < settings.CITY_FRESHNESS_TTL
+
+
+def city_is_fresh(place: str) -> bool:
+    coverage = get_city_coverage(place)
+    return coverage is not None and is_fresh(coverage["ingested_at"])
+
+
+def record_city_coverage(place: str, rows: List[Dict[str, Any]]):
+    with neo4j_span("record_coverage") as span, clients.neo4j_driver().session() as session:
+        span.set(rows=len(rows))
+        session.run(
+            """
+            MERGE (c:City {key: $key})
+            SET c.name = $name, c.ingested_at = $now
+            WITH c
+            // A city without restaurants still gets its zero counts
+            UNWIND CASE WHEN $rows = [] THEN [null] ELSE $rows END AS row
+            OPTIONAL MATCH (r:Restaurant {name: row.name, city: row.city})
+            WITH c, count(r) AS restaurants,
+                 count(r.menu_updated_at) AS menus,
+                 count(r.reviews_updated_at) AS reviews
+            SET c.restaurant_count = restaurants, c.menu_count = menus, c.review_count = reviews
+            """,
+            key=normalize(place),
+            name=place,
+            now=time.time(),
+            rows=[{"name": row["name"], "city": row["city"]} for row in rows],
+        ).consume()
+    schema_tracker.record_write(**CITY_SCHEMA)
+
+
+def stale_enrichment(rows: List[Dict[str, Any]]) -> tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Split restaurants into those whose menu and those whose reviews are missing or stale.
+    """
+    with neo4j_span("stale_enrichment") as span, clients.neo4j_driver().session() as session:
+        records = list(session.run(
+            """
+            UNWIND $rows AS row
+            MATCH (r:Restaurant {name: row.name, city: row.city})
+            RETURN r.name AS name, r.city AS city, r.menu_updated_at AS menu, r.reviews_updated_at AS reviews
+            """,
+            rows=[{"name": row["name"], "city": row["city"]} for row in rows],
+        ))
+        span.set(rows=len(records))
+    found = {(record["name"], record["city"]): record for record in records}
+
+    def _stale(row, key):
+        record = found.get((row["name"], row["city"]))
+        return record is None or not is_fresh(record[key])
+
+    menus = [row for row in rows if _stale(row, "menu")]
+    reviews = [row for row in rows if _stale(row, "reviews")]
+    return menus, reviews
 
 
 url = "https://nominatim.openstreetmap.org/search?addressdetails=1&format=jsonv2&limit=8&q="
@@ -142,16 +261,26 @@ def populate_db():
     parser.add_argument(
         "--place", help="place"
     )
+    parser.add_argument(
+        "--force", action="store_true", help="ingest even if the city data is still fresh"
+    )
     args = parser.parse_args()
-    download_to_db(args.place)
+    asyncio.run(download_to_db(args.place, force=args.force))
 
 
 # query = "warsaw+restaurant+asian"
-def download_to_db(place: str):
-    data = []
-    resp = requests.get(url + place + "+restaurant", headers=headers)
-    resp.raise_for_status()
-    data = resp.json()
+async def download_to_db(place: str, on_progress: Optional[Callable[[int, int], None]] = None, force: bool = False):
+    if not force and await asyncio.to_thread(city_is_fresh, place):
+        print(f"{place} was ingested recently, skipping.")
+        return
+
+    async def _geocode():
+        resp = await clients.async_http_client().get(url + place + "+restaurant", headers=headers)
+        resp.raise_for_status()
+        return resp.json()
+
+    # A CacheMiss fails the ingest job, so the user sees the city wasn't loaded
+    data = await search_cache.cached("nominatim", place, _geocode)
 
     rows = []
     for item in data:
@@ -163,32 +292,70 @@ def download_to_db(place: str):
 
     if not rows:
         print("No valid restaurant records found.")
-        sys.exit(0)
+        # Empty cities are covered too, so they aren't looked up again until the TTL runs out
+        await asyncio.to_thread(record_city_coverage, place, [])
+        return
 
-    ingest(rows)
+    await asyncio.to_thread(ingest, rows)
     print(f"Ingested {len(rows)} restaurants into Neo4j.")
 
-    pool = Pool(processes=8)
-
-    for item in rows:
-        pool.apply_async(search_web.fetch_menu_data, [item.get("name"), place, ])
-        pool.apply_async(search_reviews.fetch_review_data, [item.get("name"), place, ])
+    stale_menus, stale_reviews = (rows, rows) if force else await asyncio.to_thread(stale_enrichment, rows)
+    print(f"Enriching {len(stale_menus)} menus and {len(stale_reviews)} reviews.")
+
+    total = len(stale_menus) + len(stale_reviews)
+    done = 0
+
+    async def _enrich(fetch, row):
+        nonlocal done
+        async with enrichment_limits.restaurants:
+            try:
+                await fetch(row["name"], place, row["city"])
+            except Exception as e:
+                print(f"Enrichment of {row['name']} failed: {e}")
+        done += 1
+        if on_progress:
+            on_progress(done, total)
+
+    await asyncio.gather(
+        *(_enrich(search_web.fetch_menu_data, row) for row in stale_menus),
+        *(_enrich(search_reviews.fetch_review_data, row) for row in stale_reviews),
+    )
+    # Coverage and cache invalidation must see every menu and review of the city
+    await write_buffer.flush()
 
-    pool.close()
-    pool.join()
+    await asyncio.to_thread(record_city_coverage, place, rows)
+    answer_cache.invalidate_city(place)
+    intent_router.forget_cities()
 
 
 def query_neo4j(query: str) -> list[Record]:
     """
     Query Neo4j.
     """
-    with driver.session() as session:
+    with neo4j_span("adhoc", cypher=query) as span, clients.neo4j_driver().session() as session:
         result = session.run(
             query=query
         )
         records = list(result)
+        span.set(rows=len(records))
         return records
 
 
+async def aquery_neo4j(query: str, span_name: str = "adhoc", limit: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Query Neo4j on the async driver, reading at most limit rows.
+    """
+    with neo4j_span(span_name, cypher=query) as span:
+        async with clients.async_neo4j_driver().session() as session:
+            result = await session.run(query)
+            rows = []
+            async for record in result:
+                if limit is not None and len(rows) >= limit:
+                    break
+                rows.append(record.data())
+        span.set(rows=len(rows))
+    return rows
+
+
 if __name__ == "__main__":
     populate_db()
@@ -0,0 +1,109 @@
+"""Local fast path for check_input_node.
+
+Decides the obvious cases (clearly about food, clearly not) from keywords in
+the languages we serve, so only ambiguous messages go to the LLM validator.
+Keywords are stems matched against the start of normalized words, which
+covers most Polish and German inflection. A trailing space makes a keyword
+match whole words only. Cuisine names and ambiguous stems are weak: they
+only add confidence next to a clear food word, and one food word alone is
+still left to the LLM.
+"""
+
+import threading
+
+from .text_utils import normalize
+
+FOOD_STEMS = [
+    # English
+    "food", "eating", "restaurant", "dinner", "lunch", "breakfast", "brunch", "menu", "cuisine",
+    "meal", "snack", "dessert", "drink", "coffee", "cafe", "pub ", "bistro", "vegan", "vegetarian",
+    "pizza", "sushi", "ramen", "burger", "kebab", "pasta", "steak", "noodle", "curry", "taco", "dumpling",
+    "pierogi", "soup", "salad", "seafood", "bakery", "cheap eats", "takeaway", "delivery", "tasty",
+    # Polish
+    "jedzeni", "zjesc", "zjem", "jesc", "restaurac", "knajp", "obiad", "kolacj", "sniadani",
+    "kuchni", "posil", "przekask", "deser", "kawiarn", "kawa", "kawy", "piekarn", "bar mlecz", "wegan", "wegetarian",
+    "pierog", "zupa", "zurek", "barszcz", "bigos", "schabow", "golonk", "tatar", "sledz", "nalesnik",
+    "smaczn", "pyszn", "tanie", "tanio", "tania", "taniej", "gdzie zjesc",
+    # German
+    "essen ", "gericht", "speisekarte", "fruhstuck", "mittagessen", "abendessen", "kuche",
+    "wurst", "schnitzel", "kneipe", "lecker",
+]
+
+# Count only next to a FOOD_STEMS match: "population of Japan", "Daniel Craig", "bar exam"
+WEAK_FOOD_STEMS = [
+    # Ambiguous
+    "eat", "dish", "bar ", "danie", "dania",
+    # Cuisines and nationalities
+    "japan", "chin", "korea", "thai", "indian", "indyj", "wietnam", "vietnam", "mexic", "meksyk", "wlosk",
+    "italian", "italien", "francus", "french", "turec", "turkish", "greek", "greck", "hiszpan", "spanish",
+    "azjat", "asian", "polish", "polsk",
+]
+
+OFF_TOPIC_STEMS = [
+    # English
+    "weather", "forecast", "code", "python", "javascript", "program", "math", "equation", "calculat",
+    "politic", "election", "president", "stock", "crypto", "bitcoin", "football score", "homework",
+    "poem", "joke", "translate", "flight", "train ticket", "hotel", "visa",
+    # Polish
+    "pogod", "prognoz", "kod", "programow", "matematy", "rownani", "oblicz", "polityk", "wybor",
+    "prezydent", "gield", "kryptowalut", "wiersz", "zart", "dowcip", "przetlumacz", "lot ", "bilet",
+    "hotel", "wiz",
+    # German
+    "wetter", "politik", "aktie", "gedicht", "witz", "ubersetz", "flug",
+]
+
+
+def _matches(text: str, stems: list[str]) -> set[str]:
+    padded = f" {text} "
+    return {stem for stem in stems if f" {stem}" in padded}
+
+
+class InputClassifier:
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self.local_valid = 0
+        self.local_invalid = 0
+        self.fallthrough = 0
+
+    @staticmethod
+    def score(message: str) -> tuple[bool | None, float]:
+        """
+        Return (verdict, confidence). Verdict is None when the message is ambiguous.
+        """
+        text = normalize(message)
+        food = _matches(text, FOOD_STEMS)
+        weak = _matches(text, WEAK_FOOD_STEMS)
+        off_topic = _matches(text, OFF_TOPIC_STEMS)
+
+        if food and not off_topic:
+            # A single food word stays below the default threshold
+            return True, round(min(1.0, 0.5 + 0.2 * len(food) + 0.1 * len(weak)), 2)
+        if off_topic and not food:
+            return False, min(1.0, 0.6 + 0.2 * len(off_topic))
+        return None, 0.0
+
+    def classify(self, message: str) -> bool | None:
+        """
+        Return the local verdict if it is confident enough, None if the LLM has to decide.
+        """
+        verdict, confidence = self.score(message)
+        with self._lock:
+            if verdict is None or confidence < self.threshold:
+                self.fallthrough += 1
+                return None
+            if verdict:
+                self.local_valid += 1
+            else:
+                self.local_invalid += 1
+            return verdict
+
+    def stats(self) -> dict:
+        local = self.local_valid + self.local_invalid
+        total = local + self.fallthrough
+        return {
+            "local_valid": self.local_valid,
+            "local_invalid": self.local_invalid,
+            "llm_fallthrough": self.fallthrough,
+            "skipped_llm_rate": local / total if total else 0.0,
+        }
@@ -0,0 +1,312 @@
+"""Template fast path in front of Text2Cypher.
+
+Most questions come in a few shapes: restaurants of a cuisine in a city,
+the cheapest or best rated places in a city, where a dish is served,
+reviews mentioning something and what is close to a landmark.
+Those are recognised with plain string matching, their slots (city, dish,
+cuisine) filled in locally, and answered with fixed parameterized Cypher.
+That saves the Cypher generation round trip and lets Neo4j reuse cached
+plans. Anything else goes to GraphCypherQAChain as before.
+"""
+
+import asyncio
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+
+from . import clients
+from .answer_cache import city_stem
+from .config import settings
+from .metrics import neo4j_span
+from .proximity import NEARBY_QUERY, geocode, nearby, nearest
+from .text_search import DISH_SEARCH_QUERY, REVIEW_SEARCH_QUERY, search_dishes, search_reviews
+from .text_utils import normalize
+
+CUISINE_QUERY = """
+MATCH (r:Restaurant {city: $city})
+OPTIONAL MATCH (m:Menu)-[:servedIn]->(r)
+WITH r, collect(m.name) AS dishes
+WITH r, [d IN dishes WHERE any(k IN $keywords WHERE toLower(d) CONTAINS k)] AS matching
+WHERE size(matching) > 0 OR any(k IN $keywords WHERE toLower(r.name) CONTAINS k)
+RETURN r.name AS restaurant, r.city AS city, matching[..5] AS matching_dishes
+ORDER BY size(matching) DESC
+LIMIT $limit
+"""
+
+CHEAPEST_QUERY = """
+MATCH (m:Menu)-[:servedIn]->(r:Restaurant {city: $city})
+WITH r, toFloat(m.price) AS price
+WHERE price IS NOT NULL
+WITH r, avg(price) AS average_price, min(price) AS cheapest_dish, count(*) AS priced_dishes
+RETURN r.name AS restaurant, r.city AS city, round(average_price, 2) AS average_price, cheapest_dish, priced_dishes
+ORDER BY average_price ASC
+LIMIT $limit
+"""
+
+BEST_RATED_QUERY = """
+MATCH (v:Reviews)-[:isAbout]->(r:Restaurant {city: $city})
+WITH r, toFloat(v.score) AS score
+WHERE score IS NOT NULL
+WITH r, avg(score) AS rating, count(*) AS reviews
+RETURN r.name AS restaurant, r.city AS city, round(rating, 2) AS rating, reviews
+ORDER BY rating DESC, reviews DESC
+LIMIT $limit
+"""
+
+KNOWN_CITIES_QUERY = """
+MATCH (r:Restaurant)
+WHERE r.city IS NOT NULL AND r.city <> ""
+RETURN DISTINCT r.city AS city
+"""
+
+# Cuisine adjectives. Triggers are matched on the normalized question, keywords on lowercased dish / restaurant names
+CUISINES = {
+    "italian": (["italian", "wlosk", "italienisch"],
+                ["pizz", "pasta", "spaghetti", "risotto", "lasagn", "włosk", "trattoria", "osteria", "ital"]),
+    "japanese": (["japanese", "japonsk", "japanisch"], ["sushi", "ramen", "maki", "nigiri", "japo", "udon", "tempura"]),
+    "chinese": (["chinese", "chinsk", "chinesisch"], ["chiń", "chin", "dim sum", "wok"]),
+    "indian": (["indian", "indyjsk", "indisch"], ["curry", "tikka", "masala", "naan", "india", "indyj"]),
+    "vietnamese": (["vietnamese", "wietnamsk", "vietnamesisch"], ["pho", "bun ", "wietnam", "vietnam"]),
+    "thai": (["thai", "tajsk", "thailandisch"], ["thai", "tajsk", "pad thai", "tom yum"]),
+    "mexican": (["mexican", "meksykansk", "mexikanisch"], ["taco", "burrito", "quesadill", "nacho", "meksyk", "mexic"]),
+    "polish": (["polish", "polsk", "polnisch"], ["pierog", "żurek", "rosół", "schabow", "bigos", "gołąb"]),
+    "vegetarian": (["vegetarian", "vegan", "wegetarian", "wegansk", "vegetarisch"], ["wege", "vegan", "tofu", "falafel"]),
+}
+
+# Dishes asked for by name without a "where can I eat" around them: "sushi in Kraków"
+NAMED_DISHES = ["pizz", "pasta", "sushi", "ramen", "curry", "taco", "burrito", "pierog", "burger", "kebab"]
+
+CHEAP_TRIGGERS = ["cheap", "inexpensive", "budget", "affordable", "tani", "tanio", "tanie", "najtansz", "billig", "gunstig"]
+BEST_TRIGGERS = ["best", "top rated", "highest rated", "najlepsz", "najlepiej", "najwyzej ocen", "beste", "am besten"]
+
+# Group "dish" is the dish, matched on the casefolded question with its punctuation removed
+DISH_PATTERNS = [
+    re.compile(r"\bwhere (?:can|could|should|do|to)? ?(?:i |we |you )?(?:eat|get|find|order|have|try|buy) (?P<dish>.+)"),
+    re.compile(r"\b(?:who|which restaurants?|what restaurants?) (?:serves?|has|have|makes?) (?P<dish>.+)"),
+    re.compile(r"\bgdzie (?:mogę |można |moge |mozna |da się )?(?:zjeść|zjem|dostanę|dostać|kupić|zamówić|zjesc) (?P<dish>.+)"),
+    re.compile(r"\b(?:która|które|jaka|jakie) restauracj[aei]? (?:serwuje|serwują|ma|mają|podaje|podają) (?P<dish>.+)"),
+    re.compile(r"\bwo (?:kann ich|gibt es|bekomme ich|finde ich) (?P<dish>.+)"),
+]
+
+# Group "anchor" is the landmark the restaurants should be close to
+NEAR_PATTERNS = [
+    re.compile(r"\bwithin \d[\d ]*(?:km|m) (?:of|from) (?P<anchor>.+)"),
+    re.compile(r"\bw promieniu \d[\d ]*(?:km|m) od (?P<anchor>.+)"),
+    re.compile(r"\b(?:near|nearby|close to|next to) (?P<anchor>.+)"),
+    re.compile(r"\b(?:blisko|niedaleko|koło|obok|w pobliżu|w okolicy|w okolicach) (?P<anchor>.+)"),
+    re.compile(r"\b(?:in der nähe (?:von|vom|des|der)|nahe|neben) (?P<anchor>.+)"),
+]
+
+# Group "text" is what the reviews should talk about
+REVIEW_PATTERNS = [
+    re.compile(r"\b(?:reviews?|opinions?) (?:mentioning|that mention|about|saying|complaining about|with) (?P<text>.+)"),
+    re.compile(r"\b(?:complain|complains|complaints|complaining) about (?P<text>.+)"),
+    re.compile(r"\b(?:opinie|opinia|recenzje) (?:o|na temat|wspominające|które wspominają|mówiące o|z) (?P<text>.+)"),
+    re.compile(r"\b(?:bewertungen|rezensionen) (?:über|mit|zu|zum|zur) (?P<text>.+)"),
+]
+
+# "within 800 m", "w promieniu 1,5 km"
+RADIUS_PATTERN = re.compile(r"\b(\d+(?:[.,]\d+)?) ?(km|m)\b")
+
+# Where an anchor or review topic ends: "near the old town in Kraków tonight"
+SLOT_END = {"in", "w", "we", "im", "tonight", "today", "dziś", "dzisiaj", "heute"}
+SLOT_STOPWORDS = {"the", "me", "us", "here", "mnie", "nas", "tutaj", "mir", "uns", "hier"}
+
+# Anchors with these are prices or times, no places: "near 30 zł", "close to midnight"
+NOT_A_PLACE = {
+    "zł", "zl", "pln", "złotych", "eur", "euro", "euros", "usd", "dollars", "€", "$",
+    "midnight", "noon", "am", "pm", "hour", "hours", "minutes", "o", "clock",
+    "północ", "północy", "południe", "godzina", "godziny", "minut", "uhr", "mitternacht", "mittag",
+}
+
+DISH_STOPWORDS = {
+    "a", "an", "the", "some", "good", "best", "tasty", "nice", "in", "w", "we", "na", "jakieś", "dobre", "dobry",
+    "dobrą", "essen", "in", "im", "food", "something", "dinner", "lunch", "breakfast", "tonight", "today", "here",
+    "jedzenie", "coś", "obiad", "kolacja", "kolację", "śniadanie", "dziś", "dzisiaj", "tutaj", "etwas", "heute",
+    "near", "me", "city", "centre", "center", "centrum",
+}
+
+
+@dataclass
+class Intent:
+    name: str
+    cypher: str
+    params: dict = field(default_factory=dict)
+
+
+class IntentRouter:
+    def __init__(self, city_refresh: float, limit: int):
+        self.city_refresh = city_refresh
+        self.limit = limit
+        self._lock = threading.Lock()
+        self._cities: list[str] = []
+        self._cities_loaded_at = 0.0
+        self.matched: dict[str, int] = {}
+        self.fallthrough = 0
+        self.empty = 0
+
+    def known_cities(self) -> list[str]:
+        with self._lock:
+            if time.monotonic() - self._cities_loaded_at > self.city_refresh:
+                with neo4j_span("known_cities") as span, clients.neo4j_driver().session() as session:
+                    cities = [record["city"] for record in session.run(KNOWN_CITIES_QUERY)]
+                    span.set(rows=len(cities))
+                # Longest first, so "Nowy Sącz" wins over a shorter city contained in it
+                self._cities = sorted(cities, key=len, reverse=True)
+                self._cities_loaded_at = time.monotonic()
+            return self._cities
+
+    def forget_cities(self):
+        """
+        Reload the city list on the next question, e.g. after a city was ingested.
+        """
+        with self._lock:
+            self._cities_loaded_at = 0.0
+
+    def _city(self, question: str) -> tuple[str | None, str]:
+        """
+        The known city the question mentions and the question with the city removed.
+        """
+        words = normalize(question).split()
+        for city in self.known_cities():
+            stem = city_stem(city).split()
+            for i in range(len(words) - len(stem) + 1):
+                window = words[i:i + len(stem)]
+                if all(word.startswith(part) for word, part in zip(window, stem)):
+                    return city, " ".join(words[:i] + words[i + len(stem):])
+        return None, " ".join(words)
+
+    @staticmethod
+    def _dish(question: str, city: str | None) -> list[str]:
+        text = re.sub(r"[^\w\s]", " ", question.casefold())
+        text = " ".join(text.split())
+        for pattern in DISH_PATTERNS:
+            found = pattern.search(text)
+            if found:
+                break
+        else:
+            return []
+
+        city_words = set(normalize(city_stem(city)).split()) if city else set()
+        words = []
+        for word in found.group("dish").split():
+            if any(normalize(word).startswith(part) for part in city_words):
+                # Everything after the city is usually "tonight", "near the centre", ...
+                break
+            if word not in DISH_STOPWORDS and not word.isdigit():
+                words.append(word)
+        return words
+
+    @staticmethod
+    def _slot(question: str, city: str | None, patterns: list[re.Pattern], group: str) -> str | None:
+        """
+        The words of group in the first matching pattern, up to the city or a time of day.
+        """
+        text = " ".join(re.sub(r"[^\w\s]", " ", question.casefold()).split())
+        found = next((m for m in (p.search(text) for p in patterns) if m), None)
+        if found is None:
+            return None
+
+        city_words = set(normalize(city_stem(city)).split()) if city else set()
+        words = []
+        for word in found.group(group).split():
+            if word in SLOT_END or any(normalize(word).startswith(part) for part in city_words):
+                break
+            if word not in SLOT_STOPWORDS and not word.isdigit():
+                words.append(word)
+        # Nothing left for "near me": no anchor Nominatim could find
+        return " ".join(words) or None
+
+    def match(self, question: str) -> Intent | None:
+        """
+        The template answering question, or None for Text2Cypher.
+        """
+        city, rest = self._city(question)
+        padded = f" {rest} "
+
+        def said(triggers: list[str], text: str = padded) -> bool:
+            return any(f" {t}" in text for t in triggers)
+
+        # "cheap", "best" and "restaurants" qualify the question, they are no dishes
+        words = [
+            word for word in self._dish(question, city)
+            if not said(CHEAP_TRIGGERS + BEST_TRIGGERS + ["restaura", "lokal"], f" {normalize(word)}")
+        ]
+        words = words or [word for word in rest.split() if said(NAMED_DISHES, f" {word}")]
+        cuisine = next((name for name, (triggers, _) in CUISINES.items() if said(triggers)), None)
+        # "italian food" alone in a known city: every dish of the cuisine counts
+        only_cuisine = all(any(said(triggers, f" {normalize(word)}") for triggers, _ in CUISINES.values())
+                           for word in words)
+
+        anchor = self._slot(question, city, NEAR_PATTERNS, "anchor")
+        if anchor and (any(c.isdigit() for c in anchor) or NOT_A_PLACE & set(anchor.split())):
+            anchor = None
+        mentioned = self._slot(question, city, REVIEW_PATTERNS, "text")
+
+        intent = None
+        if anchor:
+            radius = RADIUS_PATTERN.search(question.casefold())
+            if radius:
+                radius = float(radius.group(1).replace(",", ".")) * (1000 if radius.group(2) == "km" else 1)
+            intent = Intent("near_place", NEARBY_QUERY, {"anchor": anchor, "city": city, "radius": radius})
+        elif mentioned:
+            intent = Intent("reviews_mentioning", REVIEW_SEARCH_QUERY, {"text": mentioned, "city": city})
+        elif city and cuisine and only_cuisine:
+            intent = Intent("cuisine_in_city", CUISINE_QUERY, {"city": city, "keywords": CUISINES[cuisine][1]})
+        elif words:
+            intent = Intent("dish_served", DISH_SEARCH_QUERY, {"text": " ".join(words), "city": city})
+        elif city and said(CHEAP_TRIGGERS):
+            intent = Intent("cheapest_in_city", CHEAPEST_QUERY, {"city": city})
+        elif city and said(BEST_TRIGGERS):
+            intent = Intent("best_rated_in_city", BEST_RATED_QUERY, {"city": city})
+
+        # "cheap sushi", "best italian near the castle": the templates can't rank by that, Text2Cypher can
+        qualified = said(CHEAP_TRIGGERS + BEST_TRIGGERS)
+        if intent is not None and qualified and intent.name not in ("cheapest_in_city", "best_rated_in_city"):
+            intent = None
+
+        with self._lock:
+            if intent is None:
+                self.fallthrough += 1
+                return None
+            self.matched[intent.name] = self.matched.get(intent.name, 0) + 1
+        intent.params["limit"] = self.limit
+        return intent
+
+    async def run(self, intent: Intent) -> list[dict]:
+        """
+        Rows of the intent's template query.
+        """
+        if intent.name == "dish_served":
+            return await search_dishes(intent.params["text"], intent.params["city"], intent.params["limit"])
+        if intent.name == "reviews_mentioning":
+            return await search_reviews(intent.params["text"], intent.params["city"], intent.params["limit"])
+        if intent.name == "near_place":
+            place = ", ".join(filter(None, [intent.params["anchor"], intent.params["city"]]))
+            found = await geocode(place)
+            if found is None:
+                print(f"Could not geocode {place!r}")
+                return []
+            lat, lon, found_city = found
+            # The anchor must be in the asked city, or in one we have restaurants for
+            cities = [intent.params["city"]] if intent.params["city"] else await asyncio.to_thread(self.known_cities)
+            if not found_city or city_stem(found_city) not in {city_stem(city) for city in cities}:
+                print(f"{place!r} geocoded to {found_city!r}, not a city we cover")
+                return []
+            if intent.params["radius"]:
+                return await nearby(lat, lon, radius=intent.params["radius"], limit=intent.params["limit"])
+            return await nearest(lat, lon, k=intent.params["limit"])
+
+        with neo4j_span(intent.name, cypher=intent.cypher) as span:
+            async with clients.async_neo4j_driver().session() as session:
+                result = await session.run(intent.cypher, intent.params)
+                rows = [record.data() async for record in result]
+            span.set(rows=len(rows))
+        return rows
+
+    def stats(self) -> dict:
+        return {"matched": dict(self.matched), "fallthrough": self.fallthrough, "empty": self.empty}
+
+
+intent_router = IntentRouter(city_refresh=settings.INTENT_CITY_REFRESH, limit=settings.INTENT_RESULT_LIMIT)
@@ -0,0 +1,184 @@
+"""Background city ingestion jobs.
+
+Jobs are persisted in the SQL database, deduplicated per city and executed
+by a fixed set of asyncio workers that live as long as the application.
+download_to_db is a coroutine, so the workers run it on the app's event loop.
+"""
+
+import asyncio
+from datetime import datetime, timezone
+
+from fastapi import APIRouter, HTTPException
+from sqlalchemy import Column, DateTime, Integer, String, select
+
+from .config import settings
+from .database import AsyncSessionLocal, Base
+from .ingest_restaurants_api import download_to_db
+from .text_utils import normalize
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+class IngestJob(Base):
+    __tablename__ = "ingest_jobs"
+
+    id = Column(Integer, primary_key=True)
+    city_key = Column(String, index=True, nullable=False)
+    city = Column(String, nullable=False)
+    status = Column(String, default=QUEUED, nullable=False)
+    progress = Column(Integer, default=0, nullable=False)
+    total = Column(Integer, default=0, nullable=False)
+    error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), default=_now)
+    updated_at = Column(DateTime(timezone=True), default=_now, onupdate=_now)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "city": self.city,
+            "status": self.status,
+            "progress": self.progress,
+            "total": self.total,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+
+class JobQueue:
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._queue: asyncio.Queue[int] = asyncio.Queue()
+        self._tasks: list[asyncio.Task] = []
+        self._enqueue_lock = asyncio.Lock()
+
+    async def start(self):
+        # Pick up whatever was left over by the previous process
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(IngestJob).where(IngestJob.status.in_([QUEUED, RUNNING])).order_by(IngestJob.id)
+            )
+            for job in result.scalars():
+                job.status = QUEUED
+                self._queue.put_nowait(job.id)
+            await session.commit()
+
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        print(f"✅ Ingest queue started with {self.workers} workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(self, city: str) -> IngestJob:
+        """
+        Queue an ingestion of the city, or return the job already queued or running for it.
+        """
+        city_key = normalize(city)
+        async with self._enqueue_lock, AsyncSessionLocal() as session:
+            result = await session.execute(
+                select(IngestJob)
+                .where(IngestJob.city_key == city_key, IngestJob.status.in_([QUEUED, RUNNING]))
+                .limit(1)
+            )
+            job = result.scalar_one_or_none()
+            if job is not None:
+                return job
+
+            job = IngestJob(city_key=city_key, city=city, status=QUEUED)
+            session.add(job)
+            await session.commit()
+            self._queue.put_nowait(job.id)
+
+        return job
+
+    async def _update(self, job_id: int, **values):
+        async with AsyncSessionLocal() as session:
+            job = await session.get(IngestJob, job_id)
+            for key, value in values.items():
+                setattr(job, key, value)
+            await session.commit()
+
+    async def _report_progress(self, job_id: int, progress: dict):
+        """
+        Save the in-memory progress of a running job every INGEST_PROGRESS_INTERVAL seconds, if it moved.
+        """
+        written = None
+        while True:
+            await asyncio.sleep(settings.INGEST_PROGRESS_INTERVAL)
+            current = (progress["done"], progress["total"])
+            if current == written:
+                continue
+            try:
+                await self._update(job_id, progress=current[0], total=current[1])
+                written = current
+            except Exception as e:
+                print(f"Could not save progress of ingest job {job_id}: {e}")
+
+    async def _worker(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                async with AsyncSessionLocal() as session:
+                    job = await session.get(IngestJob, job_id)
+                    city = job.city
+                await self._update(job_id, status=RUNNING, progress=0, total=0)
+
+                # Called for every enriched restaurant, only counted here and saved by the reporter
+                progress = {"done": 0, "total": 0}
+
+                def on_progress(done: int, total: int):
+                    progress["done"], progress["total"] = done, total
+
+                reporter = asyncio.create_task(self._report_progress(job_id, progress))
+                try:
+                    await download_to_db(city, on_progress)
+                finally:
+                    reporter.cancel()
+                    await asyncio.gather(reporter, return_exceptions=True)
+                await self._update(job_id, status=DONE, progress=progress["done"], total=progress["total"])
+                print(f"✅ Ingest job {job_id} for {city} done")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Ingest job {job_id} failed: {e}")
+                try:
+                    await self._update(job_id, status=FAILED, error=str(e))
+                except Exception as update_error:
+                    # Keep the worker alive, it's the only one taking this slot of the queue
+                    print(f"❌ Could not mark ingest job {job_id} failed: {update_error}")
+            finally:
+                self._queue.task_done()
+
+
+job_queue = JobQueue(workers=settings.INGEST_WORKERS)
+
+router = APIRouter()
+
+
+@router.get(path="/{job_id}")
+async def job_status(job_id: int):
+    async with AsyncSessionLocal() as session:
+        job = await session.get(IngestJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@router.get(path="")
+async def list_jobs(city: str | None = None, limit: int = 20):
+    query = select(IngestJob).order_by(IngestJob.id.desc()).limit(limit)
+    if city:
+        query = query.where(IngestJob.city_key == normalize(city))
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(query)
+        return [job.to_dict() for job in result.scalars()]
@@ -0,0 +1,45 @@
+"""Concurrency limits for the enrichment pipeline.
+
+Enrichment is almost all I/O wait, so a single event loop runs many
+restaurants at once. These semaphores keep each dependency in check:
+the search engine, every scraped host and the LLM. Neo4j writes go through
+the write buffer, which flushes one batch at a time.
+"""
+
+import asyncio
+import contextlib
+from urllib.parse import urlsplit
+
+from .config import settings
+
+
+class EnrichmentLimits:
+    def __init__(self):
+        self.restaurants = asyncio.Semaphore(settings.ENRICH_CONCURRENCY)
+        self.search = asyncio.Semaphore(settings.ENRICH_SEARCH_CONCURRENCY)
+        self.llm = asyncio.Semaphore(settings.ENRICH_LLM_CONCURRENCY)
+        # host -> (semaphore, tasks holding or waiting for it), dropped once no task does
+        self._hosts: dict[str, tuple[asyncio.Semaphore, int]] = {}
+
+    @contextlib.asynccontextmanager
+    async def host(self, url: str):
+        """
+        Hold one of the ENRICH_PER_HOST_CONCURRENCY slots of url's host.
+        """
+        name = urlsplit(url).hostname or ""
+        semaphore, users = self._hosts.get(name, (None, 0))
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(settings.ENRICH_PER_HOST_CONCURRENCY)
+        self._hosts[name] = (semaphore, users + 1)
+        try:
+            async with semaphore:
+                yield
+        finally:
+            semaphore, users = self._hosts[name]
+            if users == 1:
+                del self._hosts[name]
+            else:
+                self._hosts[name] = (semaphore, users - 1)
+
+
+enrichment_limits = EnrichmentLimits()
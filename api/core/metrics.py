@@ -0,0 +1,255 @@
+"""Timing spans and a Prometheus-style /metrics endpoint.
+
+Graph nodes, LLM calls, Neo4j queries and page fetches are wrapped in spans.
+A span observes its duration in a histogram labelled with what it measured
+and whether it failed. With METRICS_LOG_SPANS it is also printed as one
+JSON line, carrying details too high-cardinality for labels (like the
+generated Cypher).
+"""
+
+import functools
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any
+from uuid import UUID
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from langchain_core.callbacks import BaseCallbackHandler
+
+from .config import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+ROW_BUCKETS = (0, 1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"'
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self._lock = threading.Lock()
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # labels -> (bucket counts, sum, count)
+        self._series: dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * len(self.buckets), 0.0, 0])
+            index = bisect_left(self.buckets, value)
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    labels = _labels(self.label_names + ("le",), key + (repr(float(bound)),))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _labels(self.label_names + ("le",), key + ("+Inf",))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+                lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {total}")
+                lines.append(f"{self.name}_count{_labels(self.label_names, key)} {count}")
+        return lines
+
+
+graph_node_seconds = Histogram(
+    "tripwise_graph_node_seconds", "Time spent in a LangGraph node.", ("node", "status"))
+llm_call_seconds = Histogram(
+    "tripwise_llm_call_seconds", "Latency of LLM calls.", ("model", "purpose", "status"))
+llm_tokens = Counter(
+    "tripwise_llm_tokens_total", "Tokens used by LLM calls.", ("model", "purpose", "kind"))
+neo4j_query_seconds = Histogram(
+    "tripwise_neo4j_query_seconds", "Latency of Neo4j queries.", ("query", "status"))
+neo4j_query_rows = Histogram(
+    "tripwise_neo4j_query_rows", "Rows returned or written by Neo4j queries.", ("query",), buckets=ROW_BUCKETS)
+fetch_seconds = Histogram(
+    "tripwise_fetch_seconds", "Latency of scraped page fetches.", ("status",))
+fetch_bytes = Counter(
+    "tripwise_fetch_bytes_total", "Bytes downloaded by page fetches.")
+
+REGISTRY = [graph_node_seconds, llm_call_seconds, llm_tokens, neo4j_query_seconds, neo4j_query_rows,
+            fetch_seconds, fetch_bytes]
+
+
+def render() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+class Span:
+    def __init__(self, name: str, labels: dict):
+        self.name = name
+        self.labels = labels
+        self.fields: dict[str, Any] = {}
+
+    def set(self, **fields):
+        self.fields.update(fields)
+
+
+def _log(span: Span, seconds: float, status: str):
+    if settings.METRICS_LOG_SPANS:
+        print(json.dumps(
+            {"span": span.name, "seconds": round(seconds, 6), "status": status, **span.labels, **span.fields},
+            ensure_ascii=False, default=str,
+        ))
+
+
+@contextmanager
+def span(histogram: Histogram, name: str, **labels):
+    """
+    Time the block into histogram. Extra details go through span.set(...) and only reach the span log.
+    """
+    current = Span(name, labels)
+    started = time.perf_counter()
+    status = "ok"
+    try:
+        yield current
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        histogram.observe(seconds, status=status, **labels)
+        _log(current, seconds, status)
+
+
+@contextmanager
+def neo4j_span(query: str, cypher: str | None = None):
+    """
+    Span of a Neo4j query; set rows=... on it to record the row count.
+    """
+    with span(neo4j_query_seconds, "neo4j", query=query) as current:
+        if cypher is not None:
+            current.set(cypher=cypher)
+        yield current
+        if "rows" in current.fields:
+            neo4j_query_rows.observe(current.fields["rows"], query=query)
+
+
+@contextmanager
+def llm_span(model: str, purpose: str):
+    """
+    Span of a direct OpenAI call; set usage=response.usage on it to count tokens.
+    """
+    with span(llm_call_seconds, "llm", model=model, purpose=purpose) as current:
+        yield current
+        usage = current.fields.pop("usage", None)
+        if usage is not None:
+            current.set(prompt_tokens=usage.input_tokens, completion_tokens=usage.output_tokens)
+            llm_tokens.inc(usage.input_tokens, model=model, purpose=purpose, kind="prompt")
+            llm_tokens.inc(usage.output_tokens, model=model, purpose=purpose, kind="completion")
+
+
+def timed_node(node):
+    """
+    Decorator timing a LangGraph node.
+    """
+    @functools.wraps(node)
+    async def wrapper(state):
+        with span(graph_node_seconds, "node", node=node.__name__):
+            return await node(state)
+
+    return wrapper
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """
+    Times every LangChain model call of a graph run, labelled with the node it ran in.
+    """
+    run_inline = True
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._runs: dict[UUID, tuple[float, Span]] = {}
+
+    def _start(self, run_id: UUID, metadata: dict | None):
+        metadata = metadata or {}
+        current = Span("llm", {
+            "model": metadata.get("ls_model_name", "unknown"),
+            "purpose": metadata.get("langgraph_node", "other"),
+        })
+        with self._lock:
+            self._runs[run_id] = (time.perf_counter(), current)
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, metadata=None, **kwargs):
+        self._start(run_id, metadata)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, metadata=None, **kwargs):
+        self._start(run_id, metadata)
+
+    def _end(self, run_id: UUID, status: str, response=None):
+        with self._lock:
+            started, current = self._runs.pop(run_id, (None, None))
+        if current is None:
+            return
+        seconds = time.perf_counter() - started
+        llm_call_seconds.observe(seconds, status=status, **current.labels)
+
+        usage = None
+        if response is not None:
+            usage = (response.llm_output or {}).get("token_usage")
+            if not usage:
+                message = getattr(response.generations[0][0], "message", None) if response.generations else None
+                metadata = getattr(message, "usage_metadata", None) or {}
+                usage = {"prompt_tokens": metadata.get("input_tokens"), "completion_tokens": metadata.get("output_tokens")}
+        if usage and usage.get("prompt_tokens") is not None:
+            llm_tokens.inc(usage["prompt_tokens"], kind="prompt", **current.labels)
+            llm_tokens.inc(usage.get("completion_tokens") or 0, kind="completion", **current.labels)
+            current.set(prompt_tokens=usage["prompt_tokens"], completion_tokens=usage.get("completion_tokens"))
+        _log(current, seconds, status)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        self._end(run_id, "ok", response)
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs):
+        self._end(run_id, "error")
+
+
+llm_metrics_handler = LLMMetricsHandler()
+
+router = APIRouter()
+
+
+@router.get(path="/metrics", response_class=PlainTextResponse)
+async def metrics():
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,68 @@
+"""Hedged probing of the candidate pages of a restaurant.
+
+Instead of walking the ranked search results one by one, the top
+PROBE_TOP_K candidates are fetched at the same time. Each page is reduced
+and checked for prices (menus) or review-like text before it may go to the
+LLM. Pages are handed out in the order they pass, and whatever is still in
+flight is cancelled once the caller stops iterating.
+"""
+
+import asyncio
+from typing import AsyncIterator
+
+from .config import settings
+from .fetcher import FetchError, fetch_page
+from .html_reduce import ReducedPage, reduce_html
+
+
+def ranked_urls(results: list[dict], order: list[int]) -> list[str]:
+    """
+    Urls of the search results in the given order of ids.
+    """
+    return [results[i]["href"] for i in order if results[i].get("href")]
+
+
+async def probe_pages(
+    urls: list[str], kind: str, headers: dict, limits, k: int | None = None
+) -> AsyncIterator[tuple[str, ReducedPage]]:
+    """
+    Yield (url, page) for candidate pages passing the pre-check, keeping up to k fetches in flight.
+    Use with contextlib.aclosing so breaking out of the loop cancels the remaining fetches.
+    """
+    k = max(1, k or settings.PROBE_TOP_K)
+
+    async def _probe(url: str):
+        async with limits.host(url):
+            result = await fetch_page(url, headers=headers)
+        page = await asyncio.to_thread(reduce_html, result.text, kind)
+        print(f"Reduced {url} from {page.original_chars} to {page.reduced_chars} chars ({page.ratio:.1%})")
+        return url, page
+
+    queue = list(urls)
+    pending = set()
+    unread = set()
+    try:
+        while queue or pending:
+            while queue and len(pending) < k:
+                task = asyncio.create_task(_probe(queue.pop(0)))
+                pending.add(task)
+                unread.add(task)
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                unread.discard(task)
+                try:
+                    url, page = task.result()
+                except FetchError:
+                    continue
+                except Exception as e:
+                    print(f"Probe failed: {e!r}")
+                    continue
+                if not page.text or page.matches < settings.PROBE_MIN_MATCHES:
+                    print(f"Skipping {url}, {page.matches} {kind} matches")
+                    continue
+                yield url, page
+    finally:
+        # Still running, or finished but not looked at because the caller stopped early
+        for task in unread:
+            task.cancel()
+        await asyncio.gather(*unread, return_exceptions=True)
@@ -0,0 +1,74 @@
+"""Proximity lookups over Restaurant.location.
+
+Restaurants keep the coordinates Nominatim returned as a WGS-84 point,
+backed by the restaurant_location point index. Radius queries filter on
+point.distance(), which the planner answers from that index. Nearest-k
+widens the radius step by step instead of sorting every restaurant by
+distance, so it stays index backed as the graph grows.
+"""
+
+from . import clients
+from .config import settings
+from .metrics import neo4j_span
+from .search_cache import search_cache, CacheMiss
+
+GEOCODE_URL = "https://nominatim.openstreetmap.org/search?format=jsonv2&addressdetails=1&limit=1&q="
+GEOCODE_HEADERS = {"User-Agent": "TripWise/1.0"}
+
+NEARBY_QUERY = """
+MATCH (r:Restaurant)
+WHERE point.distance(r.location, point({latitude: $lat, longitude: $lon})) < $radius
+WITH r, point.distance(r.location, point({latitude: $lat, longitude: $lon})) AS distance
+RETURN r.name AS restaurant, r.city AS city, round(distance) AS distance_m
+ORDER BY distance ASC
+LIMIT $limit
+"""
+
+
+async def nearby(lat: float, lon: float, radius: float, limit: int) -> list[dict]:
+    """
+    Restaurants within radius meters of (lat, lon), closest first.
+    """
+    with neo4j_span("nearby") as span:
+        async with clients.async_neo4j_driver().session() as session:
+            result = await session.run(NEARBY_QUERY, lat=lat, lon=lon, radius=radius, limit=limit)
+            rows = [record.data() async for record in result]
+        span.set(rows=len(rows))
+    return rows
+
+
+async def nearest(lat: float, lon: float, k: int) -> list[dict]:
+    """
+    The k restaurants closest to (lat, lon), looked for no further than PROXIMITY_MAX_RADIUS.
+    """
+    radius = settings.PROXIMITY_START_RADIUS
+    while True:
+        rows = await nearby(lat, lon, radius, k)
+        if len(rows) >= k or radius >= settings.PROXIMITY_MAX_RADIUS:
+            return rows
+        radius = min(radius * 2, settings.PROXIMITY_MAX_RADIUS)
+
+
+async def geocode(place: str) -> tuple[float, float, str | None] | None:
+    """
+    Coordinates and city of a landmark or address like "Stare Miasto, Kraków", None if Nominatim doesn't know it.
+    """
+    async def _fetch():
+        resp = await clients.async_http_client().get(GEOCODE_URL + place, headers=GEOCODE_HEADERS)
+        resp.raise_for_status()
+        return resp.json()
+
+    try:
+        data = await search_cache.cached("nominatim", f"place:{place}", _fetch)
+    except CacheMiss as e:
+        print(e)
+        return None
+    for item in data:
+        try:
+            lat, lon = float(item["lat"]), float(item["lon"])
+        except (KeyError, TypeError, ValueError):
+            continue
+        address = item.get("address") or {}
+        city = address.get("city") or address.get("town") or address.get("village") or address.get("municipality")
+        return lat, lon, city
+    return None
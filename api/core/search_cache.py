@@ -0,0 +1,175 @@
+"""Persistent caches of external responses.
+
+search_cache holds Nominatim and DDGS responses, extraction_cache holds LLM
+menu / review extractions keyed by a hash of the page content, prompt and
+model. Entries live in the application's SQL database with a TTL per source
+and a size cap per cache (least recently used entries go first). With
+SEARCH_CACHE_MODE=replay nothing goes to the network: ingestion runs purely
+from cached responses, which makes re-ingests fast and offline runs
+deterministic.
+"""
+
+import hashlib
+import json
+import time
+from typing import Any, Awaitable, Callable
+
+from sqlalchemy import Column, Float, Integer, String, Text, delete, func, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from .config import settings
+from .database import AsyncSessionLocal, Base, engine
+
+NORMAL = "normal"
+REPLAY = "replay"
+OFF = "off"
+
+
+class CacheMiss(Exception):
+    pass
+
+
+class SearchCacheEntry(Base):
+    __tablename__ = "search_cache"
+
+    key = Column(String, primary_key=True)
+    source = Column(String, index=True, nullable=False)
+    query = Column(String, nullable=False)
+    response = Column(Text, nullable=False)
+    size = Column(Integer, nullable=False)
+    created_at = Column(Float, nullable=False)
+    accessed_at = Column(Float, index=True, nullable=False)
+
+
+class SearchCache:
+    def __init__(self, mode: str, ttls: dict[str, int], max_bytes: int):
+        self.mode = mode
+        self.ttls = ttls
+        self.max_bytes = max_bytes
+        self._table_ready = False
+        self.hits = 0
+        self.misses = 0
+
+    async def _ensure_table(self):
+        # The populate_db CLI doesn't go through the app startup that creates tables
+        if not self._table_ready:
+            async with engine.begin() as conn:
+                await conn.run_sync(SearchCacheEntry.__table__.create, checkfirst=True)
+            self._table_ready = True
+
+    @staticmethod
+    def _key(source: str, query: str) -> str:
+        return hashlib.sha256(f"{source}\0{query}".encode("utf-8")).hexdigest()
+
+    async def _get(self, source: str, query: str):
+        now = time.time()
+        async with AsyncSessionLocal() as session:
+            entry = await session.get(SearchCacheEntry, self._key(source, query))
+            if entry is None:
+                return None
+            if self.mode != REPLAY and now - entry.created_at > self.ttls.get(source, 0):
+                return None
+            entry.accessed_at = now
+            await session.commit()
+            return json.loads(entry.response)
+
+    async def _put(self, source: str, query: str, response: Any):
+        now = time.time()
+        payload = json.dumps(response, ensure_ascii=False)
+        async with AsyncSessionLocal() as session:
+            await session.merge(SearchCacheEntry(
+                key=self._key(source, query),
+                source=source,
+                query=query,
+                response=payload,
+                size=len(payload),
+                created_at=now,
+                accessed_at=now,
+            ))
+            await session.commit()
+            await self._evict(session)
+
+    async def _evict(self, session):
+        own = SearchCacheEntry.source.in_(list(self.ttls))
+        total = (await session.execute(
+            select(func.coalesce(func.sum(SearchCacheEntry.size), 0)).where(own)
+        )).scalar_one()
+        if total <= self.max_bytes:
+            return
+
+        # Drop least recently used entries until we're back under the cap
+        result = await session.execute(
+            select(SearchCacheEntry.key, SearchCacheEntry.size).where(own).order_by(SearchCacheEntry.accessed_at)
+        )
+        stale = []
+        for key, size in result:
+            if total <= self.max_bytes:
+                break
+            stale.append(key)
+            total -= size
+        await session.execute(delete(SearchCacheEntry).where(SearchCacheEntry.key.in_(stale)))
+        await session.commit()
+
+    async def cached(self, source: str, query: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Return the cached response for (source, query), or call fetch and cache its result.
+        In replay mode a miss raises CacheMiss instead of calling fetch.
+        """
+        if self.mode == OFF:
+            return await fetch()
+
+        try:
+            await self._ensure_table()
+            response = await self._get(source, query)
+        except SQLAlchemyError as e:
+            print(f"Search cache read failed: {e}")
+            response = None
+        if response is not None:
+            self.hits += 1
+            return response
+
+        self.misses += 1
+        if self.mode == REPLAY:
+            raise CacheMiss(f"No cached {source} response for {query!r}")
+
+        response = await fetch()
+        try:
+            await self._put(source, query, response)
+        except SQLAlchemyError as e:
+            print(f"Search cache write failed: {e}")
+        return response
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "mode": self.mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+search_cache = SearchCache(
+    mode=settings.SEARCH_CACHE_MODE,
+    ttls={
+        "nominatim": settings.SEARCH_CACHE_NOMINATIM_TTL,
+        "ddgs": settings.SEARCH_CACHE_DDGS_TTL,
+    },
+    max_bytes=settings.SEARCH_CACHE_MAX_BYTES,
+)
+
+extraction_cache = SearchCache(
+    mode=settings.SEARCH_CACHE_MODE,
+    ttls={
+        "menu_extraction": settings.EXTRACTION_CACHE_TTL,
+        "review_extraction": settings.EXTRACTION_CACHE_TTL,
+    },
+    max_bytes=settings.EXTRACTION_CACHE_MAX_BYTES,
+)
+
+
+def content_key(model: str, instructions: str, content: str) -> str:
+    """
+    Cache key of an LLM call: changes whenever the page, the prompt or the model does.
+    """
+    return hashlib.sha256(f"{model}\0{instructions}\0{content}".encode("utf-8")).hexdigest()
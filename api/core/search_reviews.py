@@ -1,69 +1,112 @@
 from ddgs import DDGS
-from openai import OpenAI
-from neo4j import GraphDatabase
-import requests
-import os
+import asyncio
+from contextlib import aclosing
+import hashlib
 import json
-from dotenv import load_dotenv
+import time
 
-load_dotenv()
-
-client = OpenAI(
-    # This is the default and can be omitted
-    api_key=os.environ.get("OPENAI_API_KEY"),
-)
+from . import clients
+from .graph_schema import schema_tracker
+from .limits import enrichment_limits
+from .metrics import llm_span, neo4j_span
+from .probe import probe_pages, ranked_urls
+from .search_cache import search_cache, extraction_cache, content_key
+from .text_utils import to_number
+from .url_ranking import url_ranker
+from .write_buffer import write_buffer
 
 
-URI = os.getenv("NEO4J_URI")
-USER = os.getenv("NEO4J_USER")
-PASSWORD = os.getenv("NEO4J_PASSWORD")
+EXTRACTION_MODEL = "gpt-5-nano"
+EXTRACTION_INSTRUCTIONS = "Bellow is text extracted from a restaurant web page. What are rewiews for restaurant? Format the output as json containing an array of rewiews and scores. Keep score from 1 to 5 and use following format: [{\"review\":\"review_text\", \"score\":1.5}]"
 
 headers = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 }
 
-driver = GraphDatabase.driver(URI, auth=(USER, PASSWORD))
+# Shape of what insert_from_json writes
+SCHEMA = {
+    "labels": ["Restaurant", "Reviews"],
+    "rel_types": ["isAbout"],
+    "properties": [
+        ("Restaurant", "name"),
+        ("Restaurant", "city"),
+        ("Restaurant", "reviews_updated_at"),
+        ("Reviews", "name"),
+        ("Reviews", "hash"),
+        ("Reviews", "score"),
+    ],
+}
 
 
-def fetch_review_data(name: str, place: str):
-    results = DDGS().text(name + " " + place + " opinie", max_results=10) # TODO: Szermis the language specyfic up to LLM
-    print("Search for reviews for: " + name)
+def review_hash(review: str) -> str:
+    """
+    Reviews are keyed on a hash of their text instead of the (long) text itself.
+    """
+    return hashlib.sha256(" ".join(review.split()).encode("utf-8")).hexdigest()
 
-    response = client.responses.create(
-        model="gpt-5-nano",
-        instructions="Below is an array of restaurants and urls to websites with reviews. Return the ids of the entries sorted in order of which is most likely to contain rewiews. Return id's seperated by comma",
-        input=str(results),
-    )
-    o = response.output_text
-    ids = str(o).split(',')
 
+async def fetch_review_data(name: str, place: str, city: str = "", limits=enrichment_limits):
+    query = name + " " + place + " opinie"  # TODO: Szermis the language specyfic up to LLM
 
-    for i in ids:
-        res = results[int(i)]
+    async def _search():
+        async with limits.search:
+            return await asyncio.to_thread(DDGS().text, query, max_results=10)
 
-        html = requests.get(res["href"], headers=headers)
+    results = await search_cache.cached("ddgs", query, _search)
+    print("Search for reviews for: " + name)
 
-        website = html.text[:300_000]
+    order = await url_ranker.rank("review", name, results, limits)
+    urls = ranked_urls(results, order)
+
+    async with aclosing(probe_pages(urls, "review", headers, limits)) as pages:
+        async for url, page in pages:
+            website = page.text
+
+            async def _extract():
+                async with limits.llm:
+                    with llm_span(EXTRACTION_MODEL, "review_extraction") as span:
+                        response = await clients.async_openai_client().responses.create(
+                            model=EXTRACTION_MODEL,
+                            instructions=EXTRACTION_INSTRUCTIONS,
+                            input=website,
+                        )
+                        span.set(usage=response.usage)
+                return response.output_text
+
+            try:
+                # Unchanged pages (or one page shared by many branches) skip the LLM
+                output = await extraction_cache.cached(
+                    "review_extraction", content_key(EXTRACTION_MODEL, EXTRACTION_INSTRUCTIONS, website), _extract
+                )
 
-        try:
-            response = client.responses.create(
-                model="gpt-5-nano",
-                instructions="Bellow are contents of a page in html format. What are rewiews for restaurant? Format the output as json containing an array of rewiews and scores. Keep score from 1 to 5 and use following format: [{\"review\":\"review_text\", \"score\":1.5}]",
-                input=website,
-            )
-            output = response.output_text
+                await ainsert_from_json(name, output, city=city)
+                # Leaving the loop cancels the other candidates still being fetched
+                break
+            except Exception:
+                print(f"No review data extracted from {url}")
+
+
+# Rows carry their restaurant, so one batch can hold many restaurants
+BATCH_INSERT_QUERY = """
+UNWIND $rows AS row
+MERGE (r:Restaurant {name: row.rest_name, city: row.city})
+MERGE (m:Reviews {hash: row.hash})
+SET m.name = row.review
+FOREACH (ignore IN CASE WHEN row.score IS NOT NULL THEN [1] ELSE [] END |
+    SET m.score = row.score
+)
+SET r.reviews_updated_at = $now
+MERGE (m)-[:isAbout]->(r)
+"""
 
-            insert_from_json(name, output)
-            break;
-        except:
-                print("Website to big")
+write_buffer.register("review", BATCH_INSERT_QUERY, SCHEMA)
 
 
-def insert_from_json(rest_name: str, json_string: str, delimiter: str = ","):
+def parse_items(rest_name: str, json_string: str, delimiter: str = ","):
     items = []
     if not json_string:
         print(f"No json data to insert for {rest_name}")
-        return
+        return None
 
     try:
         data = json.loads(json_string)
@@ -98,29 +141,46 @@ def insert_from_json(rest_name: str, json_string: str, delimiter: str = ","):
     else:
         items = []
 
+    for item in items:
+        # Whatever the LLM put there, Neo4j gets a number or null
+        item["score"] = to_number(item["score"])
+
     if not items:
         print(f"No valid reviews extracted for {rest_name}")
         raise Exception("No reviews")
 
-    with driver.session() as session:
+    for item in items:
+        item["hash"] = review_hash(item["review"])
 
-        def _bulk(tx, rest_name_param, rows_param):
-            tx.run(
-                """
-                UNWIND $rows AS row
-                MERGE (r:Restaurant {name: $rest_name})
-                MERGE (m:Reviews {name: row.review})
-                FOREACH (ignore IN CASE WHEN row.score IS NOT NULL THEN [1] ELSE [] END |
-                    SET m.score = row.score
-                )
-                MERGE (m)-[:isAbout]->(r)
-                """,
-                rest_name=rest_name_param,
-                rows=rows_param,
-            )
+    return items
+
+
+def insert_from_json(rest_name: str, json_string: str, delimiter: str = ",", city: str = ""):
+    items = parse_items(rest_name, json_string, delimiter)
+    if items is None:
+        return
+
+    with neo4j_span("review_insert") as span, clients.neo4j_driver().session() as session:
+        span.set(rows=len(items))
+
+        def _bulk(tx, rows_param):
+            tx.run(BATCH_INSERT_QUERY, rows=rows_param, now=time.time())
+
+        session.execute_write(_bulk, [{**item, "rest_name": rest_name, "city": city} for item in items])
+
+    schema_tracker.record_write(**SCHEMA)
+
+
+async def ainsert_from_json(rest_name: str, json_string: str, delimiter: str = ",", city: str = ""):
+    """
+    Queue the items for the write buffer, they reach Neo4j with the next batch.
+    """
+    items = parse_items(rest_name, json_string, delimiter)
+    if items is None:
+        return
 
-        session.execute_write(_bulk, rest_name, items)
+    await write_buffer.add("review", [{**item, "rest_name": rest_name, "city": city} for item in items])
 
 
 if __name__ == "__main__":
-    fetch_review_data("Restauracja Studencka", "Warszawa")
+    asyncio.run(fetch_review_data("Restauracja Studencka", "Warszawa"))
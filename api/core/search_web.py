@@ -1,68 +1,103 @@
 from ddgs import DDGS
-from openai import OpenAI
-from neo4j import GraphDatabase
-import requests
-import os
+import asyncio
+from contextlib import aclosing
 import json
-from dotenv import load_dotenv
+import time
 
-load_dotenv()
+from . import clients
+from .graph_schema import schema_tracker
+from .limits import enrichment_limits
+from .metrics import llm_span, neo4j_span
+from .probe import probe_pages, ranked_urls
+from .search_cache import search_cache, extraction_cache, content_key
+from .text_utils import to_number
+from .url_ranking import url_ranker
+from .write_buffer import write_buffer
 
-client = OpenAI(
-    # This is the default and can be omitted
-    api_key=os.environ.get("OPENAI_API_KEY"),
-)
 
-URI = os.getenv("NEO4J_URI")
-USER = os.getenv("NEO4J_USER")
-PASSWORD = os.getenv("NEO4J_PASSWORD")
+EXTRACTION_MODEL = "gpt-5-nano"
+EXTRACTION_INSTRUCTIONS = "Bellow is text extracted from a restaurant web page. What can I order from the menu? Format the output as json containing an array of dishes and their prices in a folowing format: [{\"dish\":\"dish_name\", \"price\":0.00}]"
 
 headers = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
 }
 
-driver = GraphDatabase.driver(URI, auth=(USER, PASSWORD))
+# Shape of what insert_from_json writes
+SCHEMA = {
+    "labels": ["Restaurant", "Menu"],
+    "rel_types": ["servedIn"],
+    "properties": [
+        ("Restaurant", "name"),
+        ("Restaurant", "city"),
+        ("Restaurant", "menu_updated_at"),
+        ("Menu", "name"),
+        ("Menu", "price"),
+    ],
+}
 
 
-def fetch_menu_data(name: str, place: str):
-    results = DDGS().text(name + " " + place + " menu", max_results=10)
-    print("Search for menu items in: " + name)
+async def fetch_menu_data(name: str, place: str, city: str = "", limits=enrichment_limits):
+    query = name + " " + place + " menu"
 
-    response = client.responses.create(
-        model="gpt-5-nano",
-        instructions="Below is an array of restaurants and urls to their websites. Return the ids of the entries sorted in order of which is most likely to contain the menu of the restaurant. Return id's seperated by comma",
-        input=str(results),
-    )
-    o = response.output_text
-    ids = str(o).split(',')
+    async def _search():
+        async with limits.search:
+            return await asyncio.to_thread(DDGS().text, query, max_results=10)
 
-    for i in ids:
-        res = results[int(i)]
+    results = await search_cache.cached("ddgs", query, _search)
+    print("Search for menu items in: " + name)
 
-        html = requests.get(res["href"], headers=headers)
+    order = await url_ranker.rank("menu", name, results, limits)
+    urls = ranked_urls(results, order)
+
+    async with aclosing(probe_pages(urls, "menu", headers, limits)) as pages:
+        async for url, page in pages:
+            website = page.text
+
+            async def _extract():
+                async with limits.llm:
+                    with llm_span(EXTRACTION_MODEL, "menu_extraction") as span:
+                        response = await clients.async_openai_client().responses.create(
+                            model=EXTRACTION_MODEL,
+                            instructions=EXTRACTION_INSTRUCTIONS,
+                            input=website,
+                        )
+                        span.set(usage=response.usage)
+                return response.output_text
+
+            try:
+                # Unchanged pages (or one menu page shared by many branches) skip the LLM
+                output = await extraction_cache.cached(
+                    "menu_extraction", content_key(EXTRACTION_MODEL, EXTRACTION_INSTRUCTIONS, website), _extract
+                )
 
-        website = html.text[:300_000]
+                await ainsert_from_json(name, output, city=city)
+                # Leaving the loop cancels the other candidates still being fetched
+                break
+            except Exception:
+                print(f"No menu data extracted from {url}")
 
-        try:
-            response = client.responses.create(
-                model="gpt-5-nano",
-                instructions="Bellow are contents of a page in html format. What can I order from the menu? Format the output as json containing an array of dishes and their prices in a folowing format: [{\"dish\":\"dish_name\", \"price\":0.00}]",
-                input=website,
-            )
-            output = response.output_text
 
-            insert_from_json(name, output)
-            break;
-        except:
-            print("Website to big")
+# Rows carry their restaurant, so one batch can hold many restaurants
+BATCH_INSERT_QUERY = """
+UNWIND $rows AS row
+MERGE (r:Restaurant {name: row.rest_name, city: row.city})
+MERGE (m:Menu {name: row.dish})
+FOREACH (ignore IN CASE WHEN row.price IS NOT NULL THEN [1] ELSE [] END |
+    SET m.price = row.price
+)
+SET r.menu_updated_at = $now
+MERGE (m)-[:servedIn]->(r)
+"""
+
+write_buffer.register("menu", BATCH_INSERT_QUERY, SCHEMA)
 
 
-def insert_from_json(rest_name: str, json_string: str, delimiter: str = ","):
+def parse_items(rest_name: str, json_string: str, delimiter: str = ","):
     # Normalize input to a list of dicts with keys 'dish' and 'price'
     items = []
     if not json_string:
         print(f"No json data to insert for {rest_name}")
-        return
+        return None
 
     try:
         data = json.loads(json_string)
@@ -98,30 +133,43 @@ def insert_from_json(rest_name: str, json_string: str, delimiter: str = ","):
     else:
         items = []
 
+    for item in items:
+        # Whatever the LLM put there, Neo4j gets a number or null
+        item["price"] = to_number(item["price"])
+
     if not items:
         print(f"No valid menu items extracted for {rest_name}")
         raise Exception("No menu items")
+
+    return items
+
+
+def insert_from_json(rest_name: str, json_string: str, delimiter: str = ",", city: str = ""):
+    items = parse_items(rest_name, json_string, delimiter)
+    if items is None:
         return
 
-    with driver.session() as session:
+    with neo4j_span("menu_insert") as span, clients.neo4j_driver().session() as session:
+        span.set(rows=len(items))
 
-        def _bulk(tx, rest_name_param, rows_param):
-            tx.run(
-                """
-                UNWIND $rows AS row
-                MERGE (r:Restaurant {name: $rest_name})
-                MERGE (m:Menu {name: row.dish})
-                FOREACH (ignore IN CASE WHEN row.price IS NOT NULL THEN [1] ELSE [] END |
-                    SET m.price = row.price
-                )
-                MERGE (m)-[:servedIn]->(r)
-                """,
-                rest_name=rest_name_param,
-                rows=rows_param,
-            )
+        def _bulk(tx, rows_param):
+            tx.run(BATCH_INSERT_QUERY, rows=rows_param, now=time.time())
+
+        session.execute_write(_bulk, [{**item, "rest_name": rest_name, "city": city} for item in items])
+
+    schema_tracker.record_write(**SCHEMA)
+
+
+async def ainsert_from_json(rest_name: str, json_string: str, delimiter: str = ",", city: str = ""):
+    """
+    Queue the items for the write buffer, they reach Neo4j with the next batch.
+    """
+    items = parse_items(rest_name, json_string, delimiter)
+    if items is None:
+        return
 
-        session.execute_write(_bulk, rest_name, items)
+    await write_buffer.add("menu", [{**item, "rest_name": rest_name, "city": city} for item in items])
 
 
 if __name__ == "__main__":
-    fetch_menu_data("Restauracja Studencka", "Warszawa")
+    asyncio.run(fetch_menu_data("Restauracja Studencka", "Warszawa"))
@@ -0,0 +1,108 @@
+"""Keyword search over dish names and review texts.
+
+Menu.name and Reviews.name are covered by full-text indexes created at
+bootstrap, so "where can I get tatar" or "reviews mentioning slow service"
+become a Lucene index lookup instead of a CONTAINS scan over every node.
+Neo4j ships no Polish analyzer, so unless one is installed the indexes use
+standard-folding (lowercase, ł -> l, ż -> z) and the query side stems Polish
+endings into prefix terms: "pierogów" -> "pierog*".
+"""
+
+import re
+
+from . import clients
+from .config import settings
+from .metrics import neo4j_span
+from .text_utils import normalize
+
+MENU_INDEX = "menu_name_fulltext"
+REVIEWS_INDEX = "reviews_name_fulltext"
+
+FULLTEXT_INDEXES = {
+    MENU_INDEX: "FOR (m:Menu) ON EACH [m.name]",
+    REVIEWS_INDEX: "FOR (v:Reviews) ON EACH [v.name]",
+}
+
+DISH_SEARCH_QUERY = f"""
+CALL db.index.fulltext.queryNodes("{MENU_INDEX}", $search, {{limit: $candidates}}) YIELD node, score
+MATCH (node)-[:servedIn]->(r:Restaurant)
+WHERE $city IS NULL OR r.city = $city
+RETURN node.name AS dish, node.price AS price, r.name AS restaurant, r.city AS city, round(score, 3) AS relevance
+ORDER BY relevance DESC
+LIMIT $limit
+"""
+
+REVIEW_SEARCH_QUERY = f"""
+CALL db.index.fulltext.queryNodes("{REVIEWS_INDEX}", $search, {{limit: $candidates}}) YIELD node, score
+MATCH (node)-[:isAbout]->(r:Restaurant)
+WHERE $city IS NULL OR r.city = $city
+RETURN node.name AS review, node.score AS rating, r.name AS restaurant, r.city AS city, round(score, 3) AS relevance
+ORDER BY relevance DESC
+LIMIT $limit
+"""
+
+# Characters with a meaning in Lucene query syntax
+LUCENE_SPECIAL = re.compile(r'([+\-!(){}\[\]^"~*?:\\/]|&&|\|\|)')
+
+
+def choose_analyzer(available: list[str]) -> str:
+    """
+    FULLTEXT_ANALYZER if Neo4j has it (e.g. a Polish analyzer plugin), otherwise standard-folding.
+    """
+    if settings.FULLTEXT_ANALYZER in available:
+        return settings.FULLTEXT_ANALYZER
+    print(f"⚠️ No {settings.FULLTEXT_ANALYZER} analyzer in Neo4j, full-text indexes use standard-folding")
+    return "standard-folding"
+
+
+def fulltext_index_statements(analyzer: str) -> list[str]:
+    return [
+        f"CREATE FULLTEXT INDEX {name} IF NOT EXISTS {target} "
+        f"OPTIONS {{indexConfig: {{`fulltext.analyzer`: '{analyzer}'}}}}"
+        for name, target in FULLTEXT_INDEXES.items()
+    ]
+
+
+def _stem(word: str) -> str:
+    # Same cut as the intent router: "pierogów" -> "pierog", "pizzy" -> "pizz"
+    if len(word) > 5:
+        return word[:-2]
+    if len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def lucene_query(text: str, require_all: bool) -> str:
+    """
+    Prefix terms for the words of text, all of them required or any of them ranked by relevance.
+    """
+    terms = [LUCENE_SPECIAL.sub(r"\\\1", _stem(word)) + "*" for word in normalize(text).split() if len(word) > 2]
+    return (" AND " if require_all else " ").join(terms)
+
+
+async def _search(query: str, span_name: str, text: str, require_all: bool, city: str | None, limit: int) -> list[dict]:
+    search = lucene_query(text, require_all)
+    if not search:
+        return []
+    with neo4j_span(span_name) as span:
+        async with clients.async_neo4j_driver().session() as session:
+            result = await session.run(
+                query, search=search, city=city, limit=limit, candidates=limit * settings.FULLTEXT_CANDIDATES_FACTOR
+            )
+            rows = [record.data() async for record in result]
+        span.set(rows=len(rows))
+    return rows
+
+
+async def search_dishes(text: str, city: str | None = None, limit: int = 10) -> list[dict]:
+    """
+    Dishes whose name has every word of text, with the restaurants serving them, best match first.
+    """
+    return await _search(DISH_SEARCH_QUERY, "dish_search", text, True, city, limit)
+
+
+async def search_reviews(text: str, city: str | None = None, limit: int = 10) -> list[dict]:
+    """
+    Reviews mentioning any word of text, the ones mentioning most of them first.
+    """
+    return await _search(REVIEW_SEARCH_QUERY, "review_search", text, False, city, limit)
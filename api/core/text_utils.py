@@ -0,0 +1,30 @@
+import re
+import unicodedata
+
+
+NUMBER = re.compile(r"-?\d+(?:[.,]\d+)?")
+
+
+def to_number(value) -> float | None:
+    """
+    A price or score the LLM returned as a float: 59, "59,90 zł", "4.5/5". None for anything else.
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        found = NUMBER.search(value)
+        if found:
+            return float(found.group().replace(",", "."))
+    return None
+
+
+def normalize(text: str) -> str:
+    """
+    Casefold, strip diacritics and punctuation, collapse whitespace.
+    """
+    text = unicodedata.normalize("NFKD", text.casefold().replace("ł", "l"))
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
@@ -0,0 +1,229 @@
+"""Ranking of search results before the scrapers probe them.
+
+By default results are scored locally from their domain, url path and
+snippet, so ranking costs no LLM round trip. When the two best results
+score too close to call, or with URL_RANKING_MODE=llm, the restaurant is
+ranked by the LLM instead. LLM rankings are batched: requests arriving
+within URL_RANKING_BATCH_WINDOW seconds (a whole city enriched at once)
+share one structured-output call.
+"""
+
+import asyncio
+import json
+import re
+from urllib.parse import urlsplit
+
+from . import clients
+from .config import settings
+from .html_reduce import PRICE_PATTERN, REVIEW_PATTERN
+from .metrics import llm_span
+from .text_utils import normalize
+
+RANKING_MODEL = "gpt-5-nano"
+
+RANKING_INSTRUCTIONS = {
+    "menu": "Below is a json array of restaurants, each with web search results. For every restaurant return the ids of its results sorted in order of which is most likely to contain the menu of the restaurant.",
+    "review": "Below is a json array of restaurants, each with web search results. For every restaurant return the ids of its results sorted in order of which is most likely to contain rewiews of the restaurant.",
+}
+
+RANKING_FORMAT = {
+    "type": "json_schema",
+    "name": "rankings",
+    "strict": True,
+    "schema": {
+        "type": "object",
+        "properties": {
+            "rankings": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "key": {"type": "string"},
+                        "ids": {"type": "array", "items": {"type": "integer"}},
+                    },
+                    "required": ["key", "ids"],
+                    "additionalProperties": False,
+                },
+            },
+        },
+        "required": ["rankings"],
+        "additionalProperties": False,
+    },
+}
+
+# Hosts known to carry menus / reviews, matched on the end of the hostname
+DOMAIN_SCORES = {
+    "menu": {
+        "pyszne.pl": 3, "glovoapp.com": 3, "wolt.com": 3, "ubereats.com": 3, "restaurantguru.com": 2,
+        "menu.pl": 3, "lieferando.de": 3, "facebook.com": 0.5, "tripadvisor.com": 1, "tripadvisor.pl": 1,
+    },
+    "review": {
+        "tripadvisor.com": 3, "tripadvisor.pl": 3, "restaurantguru.com": 3, "yelp.com": 3,
+        "google.com": 2, "facebook.com": 1, "zomato.com": 2, "thefork.pl": 2,
+    },
+}
+
+# Url path / snippet keywords, after text_utils.normalize
+KEYWORDS = {
+    "menu": ["menu", "karta", "cennik", "speisekarte", "dania", "oferta", "lunch"],
+    "review": ["opinie", "opinia", "recenzje", "review", "reviews", "bewertungen", "oceny", "ocena"],
+}
+
+NOISE_DOMAINS = ("wikipedia.org", "youtube.com", "instagram.com", "pinterest.", "booking.com")
+
+WORDS = re.compile(r"\w{3,}")
+
+
+def heuristic_score(result: dict, name: str, kind: str) -> float:
+    """
+    Cheap relevance guess for one DDGS result.
+    """
+    href = result.get("href") or ""
+    parts = urlsplit(href)
+    host = (parts.hostname or "").removeprefix("www.")
+    path = normalize(parts.path.replace("/", " ").replace("-", " ").replace("_", " "))
+    snippet = (result.get("title") or "") + " " + (result.get("body") or "")
+
+    if not host or any(noise in host for noise in NOISE_DOMAINS):
+        return -1.0
+
+    score = 0.0
+    for domain, weight in DOMAIN_SCORES[kind].items():
+        if host == domain or host.endswith("." + domain):
+            score += weight
+            break
+
+    # The restaurant's own site usually has its menu
+    name_words = set(WORDS.findall(normalize(name)))
+    if name_words and any(word in host.replace("-", "") for word in name_words):
+        score += 2 if kind == "menu" else 0.5
+
+    score += sum(1.5 for keyword in KEYWORDS[kind] if keyword in path.split())
+    snippet_text = normalize(snippet)
+    score += sum(0.5 for keyword in KEYWORDS[kind] if keyword in snippet_text.split())
+
+    pattern = PRICE_PATTERN if kind == "menu" else REVIEW_PATTERN
+    score += min(len(pattern.findall(snippet)), 3) * 0.5
+    return score
+
+
+def heuristic_order(results: list[dict], name: str, kind: str) -> tuple[list[int], list[float]]:
+    scores = [heuristic_score(result, name, kind) for result in results]
+    order = sorted(range(len(results)), key=lambda i: (-scores[i], i))
+    return order, scores
+
+
+class UrlRanker:
+    def __init__(self, mode: str, tiebreak: bool, margin: float, batch_size: int, window: float):
+        self.mode = mode
+        self.tiebreak = tiebreak
+        self.margin = margin
+        self.batch_size = batch_size
+        self.window = window
+        self._queues: dict[str, list] = {"menu": [], "review": []}
+        self._timers: dict[str, asyncio.Task] = {}
+        # The loop only keeps weak references to tasks, callers wait on futures these resolve
+        self._tasks: set[asyncio.Task] = set()
+
+        self.heuristic = 0
+        self.llm_ranked = 0
+        self.llm_calls = 0
+        self.llm_failures = 0
+
+    async def rank(self, kind: str, name: str, results: list[dict], limits) -> list[int]:
+        """
+        Ids of results, most promising first.
+        """
+        order, scores = heuristic_order(results, name, kind)
+        if self.mode != "llm":
+            close_call = len(order) > 1 and scores[order[0]] - scores[order[1]] < self.margin
+            if not (self.tiebreak and close_call):
+                self.heuristic += 1
+                return order
+
+        ids = await self._llm_rank(kind, name, results, limits)
+        if not ids:
+            self.heuristic += 1
+            return order
+        self.llm_ranked += 1
+        return ids + [i for i in order if i not in ids]
+
+    async def _llm_rank(self, kind: str, name: str, results: list[dict], limits) -> list[int]:
+        future = asyncio.get_running_loop().create_future()
+        queue = self._queues[kind]
+        queue.append((name, results, future))
+        if len(queue) >= self.batch_size:
+            self._queues[kind] = []
+            self._spawn(self._call(kind, queue, limits))
+        elif kind not in self._timers or self._timers[kind].done():
+            self._timers[kind] = self._spawn(self._flush_later(kind, limits))
+        return await future
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _flush_later(self, kind: str, limits):
+        await asyncio.sleep(self.window)
+        batch, self._queues[kind] = self._queues[kind], []
+        if batch:
+            await self._call(kind, batch, limits)
+
+    async def _call(self, kind: str, batch: list, limits):
+        payload = [
+            {
+                "key": str(key),
+                "restaurant": name,
+                "results": [
+                    {"id": i, "title": r.get("title"), "href": r.get("href"), "snippet": (r.get("body") or "")[:200]}
+                    for i, r in enumerate(results)
+                ],
+            }
+            for key, (name, results, _) in enumerate(batch)
+        ]
+        rankings = {}
+        try:
+            async with limits.llm:
+                with llm_span(RANKING_MODEL, "url_ranking") as span:
+                    response = await clients.async_openai_client().responses.create(
+                        model=RANKING_MODEL,
+                        instructions=RANKING_INSTRUCTIONS[kind],
+                        input=json.dumps(payload, ensure_ascii=False),
+                        text={"format": RANKING_FORMAT},
+                    )
+                    span.set(usage=response.usage, restaurants=len(batch))
+            self.llm_calls += 1
+            for entry in json.loads(response.output_text)["rankings"]:
+                rankings[entry["key"]] = entry["ids"]
+            print(f"Ranked {kind} results of {len(batch)} restaurants in one call")
+        except Exception as e:
+            self.llm_failures += 1
+            print(f"Batched url ranking failed: {e!r}")
+
+        for key, (_, results, future) in enumerate(batch):
+            ids = []
+            for i in rankings.get(str(key), []):
+                if 0 <= i < len(results) and i not in ids:
+                    ids.append(i)
+            if not future.done():
+                future.set_result(ids)
+
+    def stats(self) -> dict:
+        return {
+            "mode": self.mode,
+            "heuristic": self.heuristic,
+            "llm_ranked": self.llm_ranked,
+            "llm_calls": self.llm_calls,
+            "llm_failures": self.llm_failures,
+        }
+
+
+url_ranker = UrlRanker(
+    mode=settings.URL_RANKING_MODE,
+    tiebreak=settings.URL_RANKING_LLM_TIEBREAK,
+    margin=settings.URL_RANKING_TIE_MARGIN,
+    batch_size=settings.URL_RANKING_BATCH_SIZE,
+    window=settings.URL_RANKING_BATCH_WINDOW,
+)
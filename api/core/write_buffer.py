@@ -0,0 +1,149 @@
+"""Write-behind buffer for enrichment inserts.
+
+Enrichment tasks hand their extracted rows to the buffer instead of each
+running its own small transaction. Rows are flushed as one large UNWIND per
+kind when the buffer reaches WRITE_BATCH_SIZE rows or every
+WRITE_FLUSH_INTERVAL seconds, whichever comes first. A batch Neo4j rejects
+over bad data is split in halves until the offending rows are found, so one
+bad row only loses itself. Any other error (auth, syntax, configuration)
+aborts the flush and keeps the rows for the next one.
+"""
+
+import asyncio
+import time
+from collections import defaultdict
+
+from neo4j.exceptions import ConstraintError, CypherTypeError, ServiceUnavailable, SessionExpired, TransientError
+
+from . import clients
+from .config import settings
+from .graph_schema import schema_tracker
+from .metrics import neo4j_span
+
+RETRYABLE_ERRORS = (TransientError, ServiceUnavailable, SessionExpired)
+# Errors caused by the values of some row; TypeError is the driver refusing to pack one
+DATA_ERRORS = (ConstraintError, CypherTypeError, TypeError)
+
+
+class WriteBuffer:
+    def __init__(self, batch_size: int, interval: float, retries: int):
+        self.batch_size = batch_size
+        self.interval = interval
+        self.retries = retries
+        self._kinds: dict[str, tuple[str, dict]] = {}
+        self._rows: defaultdict[str, list] = defaultdict(list)
+        self._flush_lock = asyncio.Lock()
+        self._timer: asyncio.Task | None = None
+
+        self.batches = 0
+        self.rows_written = 0
+        self.rows_failed = 0
+        self.retried = 0
+        self.flush_latency_total = 0.0
+        self.flush_latency_max = 0.0
+
+    def register(self, kind: str, query: str, schema: dict):
+        """
+        Declare a kind of rows, the UNWIND $rows query that writes them and the schema it touches.
+        """
+        self._kinds[kind] = (query, schema)
+
+    def pending(self) -> int:
+        return sum(len(rows) for rows in self._rows.values())
+
+    async def add(self, kind: str, rows: list[dict]):
+        self._rows[kind].extend(rows)
+        if self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._flush_periodically())
+        if self.pending() >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        async with self._flush_lock:
+            pending, self._rows = self._rows, defaultdict(list)
+            try:
+                for kind, rows in pending.items():
+                    while rows:
+                        await self._write(kind, rows[:self.batch_size])
+                        del rows[:self.batch_size]
+            except Exception:
+                # Not the rows' fault, keep whatever wasn't written for the next flush
+                for kind, rows in pending.items():
+                    self._rows[kind][:0] = rows
+                raise
+
+    async def close(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            await asyncio.gather(self._timer, return_exceptions=True)
+            self._timer = None
+        await self.flush()
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            if self.pending():
+                try:
+                    await self.flush()
+                except Exception as e:
+                    print(f"Write buffer flush failed: {e}")
+
+    async def _write(self, kind: str, rows: list[dict]):
+        query, schema = self._kinds[kind]
+
+        async def _bulk(tx):
+            result = await tx.run(query, rows=rows, now=time.time())
+            await result.consume()
+
+        started = time.monotonic()
+        for attempt in range(self.retries + 1):
+            try:
+                with neo4j_span(f"{kind}_insert") as span:
+                    async with clients.async_neo4j_driver().session() as session:
+                        await session.execute_write(_bulk)
+                    span.set(rows=len(rows), attempt=attempt)
+                break
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.retries:
+                    print(f"❌ Dropping {len(rows)} {kind} rows after {attempt + 1} attempts: {e}")
+                    self.rows_failed += len(rows)
+                    return
+                self.retried += 1
+                await asyncio.sleep(0.5 * 2 ** attempt)
+            except DATA_ERRORS as e:
+                # Not going away on retry, some row Neo4j can't store
+                if len(rows) == 1:
+                    print(f"❌ Dropping {kind} row {rows[0]!r}: {e}")
+                    self.rows_failed += 1
+                    return
+                middle = len(rows) // 2
+                await self._write(kind, rows[:middle])
+                await self._write(kind, rows[middle:])
+                return
+
+        elapsed = time.monotonic() - started
+        self.batches += 1
+        self.rows_written += len(rows)
+        self.flush_latency_total += elapsed
+        self.flush_latency_max = max(self.flush_latency_max, elapsed)
+        schema_tracker.record_write(**schema)
+        print(f"Flushed {len(rows)} {kind} rows in {elapsed:.2f}s")
+
+    def stats(self) -> dict:
+        return {
+            "pending_rows": self.pending(),
+            "batches": self.batches,
+            "rows_written": self.rows_written,
+            "rows_failed": self.rows_failed,
+            "retries": self.retried,
+            "avg_batch_size": self.rows_written / self.batches if self.batches else 0.0,
+            "flush_latency_avg": self.flush_latency_total / self.batches if self.batches else 0.0,
+            "flush_latency_max": self.flush_latency_max,
+        }
+
+
+write_buffer = WriteBuffer(
+    batch_size=settings.WRITE_BATCH_SIZE,
+    interval=settings.WRITE_FLUSH_INTERVAL,
+    retries=settings.WRITE_RETRIES,
+)
@@ -1,10 +1,19 @@
 # app/main.py
 
+import asyncio
+
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from core import chat
+from core import clients
+from core import jobs
+from core import graph_bootstrap
+from core import metrics
+from core.checkpointer import checkpointer
+from core.dataset_logger import dataset_logger
+from core.write_buffer import write_buffer
 from core.config import settings
 from core import database
 
@@ -32,19 +41,31 @@ def create_app() -> FastAPI:
     # app.include_router(users.router, prefix="/api/v1/users", tags=["Users"])
     # app.include_router(trips.router, prefix="/api/v1/trips", tags=["Trips"])
     app.include_router(chat.router, prefix=f"{settings.API_V1_STR}/chat", tags=["AI Assistant"])
+    app.include_router(jobs.router, prefix=f"{settings.API_V1_STR}/jobs", tags=["Ingestion"])
+    app.include_router(metrics.router, tags=["Monitoring"])
 
     # ---- Startup & Shutdown Events ----
     @app.on_event("startup")
     async def startup_event():
         print("🚀 Starting TripWise backend...")
+        await asyncio.to_thread(clients.init)
         # (Optional) test DB connection
         async with database.engine.begin() as conn:
             await conn.run_sync(database.Base.metadata.create_all)
         print("✅ Database ready")
+        await asyncio.to_thread(graph_bootstrap.bootstrap_schema)
+        await jobs.job_queue.start()
+        dataset_logger.start()
+        checkpointer.start()
 
     @app.on_event("shutdown")
     async def shutdown_event():
         print("🛑 Shutting down TripWise backend...")
+        await checkpointer.stop()
+        await jobs.job_queue.stop()
+        await write_buffer.close()
+        await asyncio.to_thread(dataset_logger.stop)
+        await clients.close()
 
     return app
 
@@ -10,12 +10,20 @@ import ChatInput from "@/components/chat-input.tsx";
 import {useState} from "react"
 import {AppSidebar} from "@/components/app-sidebar.tsx";
 
+const NODE_LABELS: Record<string, string> = {
+    check_input_node: "Checking your question...",
+    query_db_node: "Looking for restaurants...",
+    fit_db_node: "Scheduling restaurant data fetch for this city...",
+}
+
 export default function App() {
     const [messages, setMessages] = useState([
         {type: "assistant", content: "Hi, I'm your food assistant. I will help you choose best suiting restaurant. Where do you wanna eat?"},
     ])
     // const [value, setValue] = useState("")
     const [loading, setLoading] = useState(false)
+    // Conversation id assigned by the API on the first message
+    const [sessionId, setSessionId] = useState<string | null>(null)
 
     async function handleSubmit(e: React.FormEvent) {
         e.preventDefault()
@@ -29,22 +37,52 @@ export default function App() {
 
 
         try {
-            // in React
-
-            const res = await fetch(`${import.meta.env.VITE_API_URL}/chat/message`, {
+            const res = await fetch(`${import.meta.env.VITE_API_URL}/chat/stream`, {
                 method: "POST",
                 headers: {
                     "Content-Type": "application/json",
                 },
-                body: JSON.stringify({message}),
+                body: JSON.stringify({message, session_id: sessionId}),
             })
 
-            if (!res.ok) {
+            if (!res.ok || !res.body) {
                 throw new Error("Request failed")
             }
 
-            const data = await res.json()
-            setMessages((prev) => [...prev, {type: "assistant", content: data.result}])
+            // Placeholder assistant message, filled in as events arrive
+            setMessages((prev) => [...prev, {type: "assistant", content: ""}])
+            const updateLast = (content: string) =>
+                setMessages((prev) => [...prev.slice(0, -1), {type: "assistant", content}])
+
+            const reader = res.body.pipeThrough(new TextDecoderStream()).getReader()
+            let buffer = ""
+            let answer = ""
+
+            while (true) {
+                const {value: chunk, done} = await reader.read()
+                if (done) break
+                buffer += chunk
+
+                const frames = buffer.split("\n\n")
+                buffer = frames.pop() ?? ""
+
+                for (const frame of frames) {
+                    const event = frame.match(/^event: (.*)$/m)?.[1]
+                    const data = JSON.parse(frame.match(/^data: (.*)$/m)?.[1] ?? "{}")
+
+                    if (event === "start" && data.session_id) {
+                        setSessionId(data.session_id)
+                    } else if (event === "node" && data.status === "start") {
+                        answer = ""
+                        updateLast(NODE_LABELS[data.node] ?? "")
+                    } else if (event === "token") {
+                        answer += data.token
+                        updateLast(answer)
+                    } else if (event === "done") {
+                        updateLast(data.result)
+                    }
+                }
+            }
         } catch (err) {
             console.error(err)
             setMessages((prev) => [...prev, {type: "assistant", content: "❌ Failed to send message"}])